@@ -1,6 +1,11 @@
 import './App.css'
-import { useState, useEffect } from 'react'
-import tokenData from './data/erc20_full_data.json'
+import classSummary from './data/class_summary.json'
+import incentiveSummary from './data/incentive_summary.json'
+import priceAndMarketSummary from './data/price_and_market_summary.json'
+import riskAndSecuritySummary from './data/risk_and_security_summary.json'
+import vestingAndCliffSummary from './data/vesting_and_cliff_summary.json'
+import distributionSummary from './data/distribution_summary.json'
+import governanceSummary from './data/governance_summary.json'
 import TokenClassBar from './components/TokenClassBar'
 import IncentiveBar from './components/IncentiveBar'
 import PriceAndMarketBar from './components/PriceAndMarketBar'
@@ -13,12 +18,6 @@ import CirculatingSupplyChart from './components/CirculatingSupplyChart';
 import MaxSupplyChart from './components/MaxSupplyChart';
 
 function App() {
-  const [tokens, setTokens] = useState([])
-
-  useEffect(() => {
-    setTokens(tokenData)
-  }, [])
-
   return (
     <>
       <div className="scroll-container">
@@ -61,7 +60,7 @@ function App() {
               <div className="category-box right class">
                 <h3 className="h_right">Token Class</h3>
                 <h5 className="h_right">Utility Token provide access to a product or service within a specific blockchain ecosystem. Payment Token serve primarily as a medium of exchange for goods and services, like digital currency. Investment Token represent an asset or profit share, often regulated as a security or investment vehicle.</h5>
-                <TokenClassBar tokens={tokens} />
+                <TokenClassBar data={classSummary} />
               </div>
 
             {/* Incentive */}
@@ -69,7 +68,7 @@ function App() {
               <div className="category-box right incentive">
                 <h3 className="h_right">Incentive mechanism</h3>
                 <h5 className="h_right">An incentive mechanism is a structured system of rewards and penalties used in blockchain and token economies to influence participant behavior, encourage desired actions, deter harmful activities, and ensure alignment between individual incentives and the overall network’s goals and sustainability.</h5>
-                  <IncentiveBar tokens={tokens} />
+                  <IncentiveBar data={incentiveSummary} />
               </div>
 
             {/* Price and Market */}
@@ -77,7 +76,7 @@ function App() {
               <div className="category-box right price_and_market">
                 <h3 className="h_right">Price and Market Mechanism</h3>
                 <h5 className="h_right">A price and market mechanism is the process by which supply and demand interact in a market to determine prices, allocate resources, and guide production, consumption, and investment decisions through signals.</h5>
-                  <PriceAndMarketBar tokens={tokens} />
+                  <PriceAndMarketBar data={priceAndMarketSummary} />
               </div>
 
             {/* Risk and Security */}
@@ -85,7 +84,7 @@ function App() {
               <div className="category-box right risk_and_security">
                 <h3 className="h_right">Risk and Security Mechanism</h3>
                 <h5 className="h_right">A risk and security mechanism for tokens refers to the safeguards, policies, and technical measures implemented to protect a blockchain project’s assets, users, and infrastructure from vulnerabilities, attacks, and operational failures, ensuring trust, stability, and regulatory compliance.</h5>
-                  <TokenRiskAndsecurityBar tokens={tokens} />
+                  <TokenRiskAndsecurityBar data={riskAndSecuritySummary} />
               </div>
 
             {/* Vetsing and Cliff */}
@@ -93,21 +92,21 @@ function App() {
               <div className="category-box right vesting_and_cliff">
                 <h3 className="h_right">Vesting and Cliff</h3>
                 <h5 className="h_right">A vesting and cliff schedule defines when and how allocated tokens are released to recipients over time. The cliff is an initial waiting period during which no tokens are released, followed by a vesting phase where tokens are unlocked gradually or in milestones. These mechanisms align incentives, prevent immediate sell-offs, and encourage long-term commitment from team members, investors, and other stakeholders.</h5>
-                  <VestingAndCliffBar tokens={tokens} />
+                  <VestingAndCliffBar data={vestingAndCliffSummary} />
               </div>
             {/* Distribution*/}
             <div className="roadmap-pointer roadmap-pointer-distribution"></div>
               <div className="category-box left distribution">
                 <h3 className="h_right">Distribution</h3>
                 <h5 className="h_right">The process by which a project allocates and delivers its tokens to various stakeholders or the public. Distribution methods can include sales, rewards, incentives, or free allocations, and are designed to fund development, encourage adoption, and align the interests of investors, team members, and the community.</h5>
-                  <DistributionBar tokens={tokens} />
+                  <DistributionBar data={distributionSummary} />
               </div>
             {/* Governance*/}
             <div className="roadmap-pointer roadmap-pointer-governance"></div>
               <div className="category-box right governance">
                 <h3 className="h_right">Governance</h3>
                 <h5 className="h_right">The systems, rules, and processes through which decisions are made and implemented within a blockchain project or decentralized network. Governance defines how stakeholders propose, debate, and vote on changes to protocols, allocate resources, and set strategic direction, aiming to balance transparency, efficiency, and community participation.</h5>
-                  <GovernanceBar tokens={tokens} />
+                  <GovernanceBar data={governanceSummary} />
               </div>
 
             </div>
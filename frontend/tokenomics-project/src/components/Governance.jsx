@@ -1,6 +1,6 @@
 import './Bar.css';
 
-const GovernanceBar = ({ tokens = [] }) => {
+const GovernanceBar = ({ data = { total_tokens: 0, categories: {}, tokens: [] } }) => {
   const classes = {
     "On-Chain Governance": {
       field: "On_Chain_Governance",
@@ -50,21 +50,17 @@ const GovernanceBar = ({ tokens = [] }) => {
 
   const summary = Object.entries(classes)
     .map(([label, { field, definition }]) => {
-      const matching = tokens.filter(t => t?.[field] === 1);
+      const category = data.categories[field] ?? { count: 0, tokens: [] };
       return {
         label,
         definition,
-        count: matching.length,
-        names: matching.map(t => ({
-          name: t.name,
-          info: t.Information_Governance,
-          uncertainty: t.Uncertainty_Governance
-        }))
+        count: category.count,
+        names: category.tokens.map(i => data.tokens[i])
       };
     })
     .sort((a, b) => b.count - a.count);
 
-  const total = tokens.length || 1;
+  const total = data.total_tokens || 1;
 
   return (
     <div>
@@ -85,7 +81,7 @@ const GovernanceBar = ({ tokens = [] }) => {
                 <div className="segment-tooltip">
                   <strong>{label}</strong><br />
                   <em>{definition}</em><br /><br />
-                  {count} of {tokens.length} Tokens
+                  {count} of {data.total_tokens} Tokens
                   <ul>
                     {names.map((token, i) => (
                       <li key={i}>
@@ -10,7 +10,7 @@ function getColor(index) {
   return colors[index % colors.length];
 }
 
-const TokenIncentiveBar = ({ tokens = [] }) => {
+const TokenIncentiveBar = ({ data = { total_tokens: 0, categories: {}, tokens: [] } }) => {
   const classes = {
     "Staking Rewards": {
       field: "Staking_Rewards",
@@ -40,21 +40,17 @@ const TokenIncentiveBar = ({ tokens = [] }) => {
 
   const summary = Object.entries(classes)
     .map(([label, { field, definition }]) => {
-      const matching = tokens.filter(t => t?.[field] === 1);
+      const category = data.categories[field] ?? { count: 0, tokens: [] };
       return {
         label,
         definition,
-        count: matching.length,
-        names: matching.map(t => ({
-          name: t.name,
-          info: t.Information_Incentive,
-          uncertainty: t.Uncertainty_Incentive
-        }))
+        count: category.count,
+        names: category.tokens.map(i => data.tokens[i])
       };
     })
     .sort((a, b) => b.count - a.count);
 
-  const total = tokens.length || 1;
+  const total = data.total_tokens || 1;
 
   return (
     <div>
@@ -72,7 +68,7 @@ const TokenIncentiveBar = ({ tokens = [] }) => {
                 <div className="segment-tooltip">
                   <strong>{label}</strong><br />
                   <em>{definition}</em><br /><br />
-                  {count} of {tokens.length} Tokens
+                  {count} of {data.total_tokens} Tokens
                   <ul>
                     {names.map((token, i) => (
                       <li key={i}>
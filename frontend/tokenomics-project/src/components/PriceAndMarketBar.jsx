@@ -1,13 +1,13 @@
 import './Bar.css';
 
-const PriceAndMarketBar = ({ tokens = [] }) => {
+const PriceAndMarketBar = ({ data = { total_tokens: 0, categories: {}, tokens: [] } }) => {
   const classes = {
     "Fixed Supply": {
       field: "Fixed_Supply",
       definition: "The total number of tokens is capped and cannot be increased."
     },
     "Inflationary Supply": {
-      field: "Inflationary_Supply_Mining",
+      field: "Inflationary_Supply_Price_and_Market",
       definition: "New tokens are continuously created, increasing total supply over time."
     },
     "Deflationary Mechanisms": {
@@ -50,21 +50,17 @@ const PriceAndMarketBar = ({ tokens = [] }) => {
 
   const summary = Object.entries(classes)
     .map(([label, { field, definition }]) => {
-      const matching = tokens.filter(t => t?.[field] === 1);
+      const category = data.categories[field] ?? { count: 0, tokens: [] };
       return {
         label,
         definition,
-        count: matching.length,
-        names: matching.map(t => ({
-          name: t.name,
-          info: t.Information_Price_and_Market,
-          uncertainty: t.Uncertainty_Price_and_Market
-        }))
+        count: category.count,
+        names: category.tokens.map(i => data.tokens[i])
       };
     })
     .sort((a, b) => b.count - a.count);
 
-  const total = tokens.length || 1;
+  const total = data.total_tokens || 1;
 
   return (
     <div>
@@ -82,7 +78,7 @@ const PriceAndMarketBar = ({ tokens = [] }) => {
                 <div className="segment-tooltip">
                   <strong>{label}</strong><br />
                   <em>{definition}</em><br /><br />
-                  {count} of {tokens.length} Tokens
+                  {count} of {data.total_tokens} Tokens
                   <ul>
                     {names.map((token, i) => (
                       <li key={i}>
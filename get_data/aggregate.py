@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from merge import subject_columns
+from models import SUBJECT_FIELDS
+from sink import OutputSink, default_sink
+
+"""
+Precomputed category summaries of every tokenomics subject for the frontend.
+
+The categories are the 0/1 fields of the pydantic class of the subject.
+For each category the number of tokens and the indices of the matching
+tokens are stored, the name, Information_* and Uncertainty_* text of a
+token only once per subject. The charts load these small files instead of
+the full data set and do not filter it on every render.
+"""
+
+TOKENOMICS_SUBJECTS = list(SUBJECT_FIELDS)
+
+
+def split_columns(subject: str) -> tuple[list[str], str, str]:
+    """
+    Category columns, information column and uncertainty column of a
+    subject, named as in the merged data set.
+    """
+    flags, info, uncertainty = [], None, None
+    for _, column in subject_columns(subject):
+        if column.startswith("Information_"):
+            info = column
+        elif column.startswith("Uncertainty_"):
+            uncertainty = column
+        else:
+            flags.append(column)
+    return flags, info, uncertainty
+
+
+def subject_summary(df: pd.DataFrame, subject: str) -> dict:
+    """
+    Counts and matching tokens per category of one subject.
+    """
+    flags, info, uncertainty = split_columns(subject)
+    matrix = df.reindex(columns=flags).to_numpy(dtype=float) == 1
+
+    # only tokens of at least one category are listed
+    listed = np.flatnonzero(matrix.any(axis=1))
+    position = np.full(len(df), -1)
+    position[listed] = np.arange(len(listed))
+
+    texts = df.reindex(columns=["name", info, uncertainty]).iloc[listed]
+    texts = texts.astype(object).where(texts.notna(), None)
+    tokens = [
+        {"name": name, "info": text, "uncertainty": note}
+        for name, text, note in texts.itertuples(index=False)
+    ]
+
+    categories = {}
+    for i, column in enumerate(flags):
+        rows = np.flatnonzero(matrix[:, i])
+        categories[column] = {
+            "count": int(rows.size),
+            "tokens": position[rows].tolist()
+        }
+
+    return {
+        "subject": subject,
+        "total_tokens": len(df),
+        "categories": categories,
+        "tokens": tokens
+    }
+
+
+def build_summaries(df: pd.DataFrame,
+                    subjects: list[str] = TOKENOMICS_SUBJECTS,
+                    sink: OutputSink | None = None) -> dict:
+    """
+    Write {subject}_summary.json of every subject to data/result and the
+    frontend.
+    """
+    sink = sink or default_sink()
+    summaries = {}
+    for subject in subjects:
+        data = subject_summary(df, subject)
+        summaries[subject] = data
+        file_name = f"{subject}_summary.json"
+        sink.write(json.dumps(data, ensure_ascii=False,
+                              separators=(",", ":")),
+                   result=file_name, frontend=file_name)
+
+    return summaries
+
+
+if __name__ == "__main__":
+    build_summaries(pd.read_csv(Path("./data/result/erc20_full_data.csv")))
@@ -0,0 +1,242 @@
+import argparse
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+import pandas as pd
+from models import SUBJECT_FIELDS
+
+"""
+Artifact store of the agent outputs and the extracted results.
+
+Every output of a pipeline run is a row of one SQLite table keyed by run,
+stage, CMC id and subject: the text of the agent (stage research or
+research_batch) and the validated JSON result (stage extract). The table
+is clustered by its key, so "all subjects of all tokens of run X" is one
+sequential scan, and token names are only stored, never used as file
+names. Runs are named by their UTC start time and only created by
+start_run(), which the research and extract commands call; opening the
+store to read, e.g. for the merge, writes nothing. The recorded data/
+text_output.zip and data/json_output.zip can be imported as a run.
+
+python artifacts.py import [text zip] [json zip]
+python artifacts.py runs
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT PRIMARY KEY,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    run TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    cmc_id INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    token TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (run, stage, cmc_id, subject)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS artifacts_key
+    ON artifacts (stage, cmc_id, subject, run);
+"""
+
+# newest artifact of every token and subject up to a run
+LATEST = """
+SELECT a.cmc_id, a.subject, a.token, a.content FROM artifacts a
+WHERE a.stage = :stage AND a.run = (
+    SELECT MAX(b.run) FROM artifacts b
+    WHERE b.stage = a.stage AND b.cmc_id = a.cmc_id
+      AND b.subject = a.subject AND b.run <= :run)
+ORDER BY a.cmc_id, a.subject
+"""
+
+RUN_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+class ArtifactStore:
+    """
+    SQLite store under data/artifacts.sqlite. Writes go to the current
+    run, the latest one unless start_run() started another. Shared by the
+    async workers and the extraction threads, several processes can use
+    the same file like the job table.
+    """
+
+    def __init__(self, path: Path = Path("data/artifacts.sqlite")):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        # autocommit, every write is one statement
+        self.conn = sqlite3.connect(self.path, timeout=60,
+                                    isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # None until the first run is started
+        self.run = self.latest_run()
+
+    def latest_run(self) -> str | None:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT MAX(run) FROM runs").fetchone()[0]
+
+    def start_run(self, run: str | None = None) -> str:
+        """
+        Start a run and make it the current one. Runs are ordered by
+        their name, by default the UTC time.
+        """
+        run = run or datetime.now(timezone.utc).strftime(RUN_FORMAT)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO runs (run, started_at) VALUES (?, ?)",
+                (run, time.time()))
+        self.run = run
+        return run
+
+    def runs(self) -> list[dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT r.run, a.stage, COUNT(a.cmc_id) FROM runs r "
+                "LEFT JOIN artifacts a ON a.run = r.run "
+                "GROUP BY r.run, a.stage ORDER BY r.run, a.stage"
+            ).fetchall()
+        runs = {}
+        for run, stage, count in rows:
+            runs.setdefault(run, {})
+            if stage is not None:
+                runs[run][stage] = count
+        return [{"run": run, **stages} for run, stages in runs.items()]
+
+    def current_run(self) -> str:
+        if self.run is None:
+            raise ValueError(f"No run in {self.path}, start_run() first")
+        return self.run
+
+    def put(self, stage: str, cmc_id: int, subject: str, token: str,
+            content: str):
+        run = self.current_run()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO artifacts (run, stage, cmc_id, "
+                "subject, token, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run, stage, int(cmc_id), subject, token, content,
+                 time.time()))
+
+    def put_many(self, rows, run: str | None = None) -> int:
+        """
+        Bulk insert of (stage, cmc_id, subject, token, content) rows in
+        one transaction.
+        """
+        run = run or self.current_run()
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            cursor = self.conn.executemany(
+                "INSERT OR REPLACE INTO artifacts (run, stage, cmc_id, "
+                "subject, token, content, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run, stage, int(cmc_id), subject, token,
+                  content, now)
+                 for stage, cmc_id, subject, token, content in rows])
+            self.conn.execute("COMMIT")
+        return cursor.rowcount
+
+    def get(self, stage: str, cmc_id: int, subject: str) -> str | None:
+        """
+        The newest artifact up to the current run, None if there is none.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content FROM artifacts WHERE stage = ? "
+                "AND cmc_id = ? AND subject = ? AND run <= ? "
+                "ORDER BY run DESC LIMIT 1",
+                (stage, int(cmc_id), subject, self.run)).fetchone()
+        return row[0] if row else None
+
+    def scan(self, stage: str, run: str | None = None,
+             latest: bool = False) -> list[tuple]:
+        """
+        (cmc_id, subject, token, content) of all artifacts of a stage in
+        one run ordered by token and subject. With latest the newest
+        artifact of every token and subject up to that run, so tokens
+        that failed in a run keep their earlier result.
+        """
+        run = run or self.run
+        with self.lock:
+            if latest:
+                return self.conn.execute(
+                    LATEST, {"stage": stage, "run": run}).fetchall()
+            return self.conn.execute(
+                "SELECT cmc_id, subject, token, content FROM artifacts "
+                "WHERE run = ? AND stage = ? ORDER BY cmc_id, subject",
+                (run, stage)).fetchall()
+
+    def import_zips(self, erc20_data: pd.DataFrame,
+                    text_zip: Path = Path("data/text_output.zip"),
+                    json_zip: Path = Path("data/json_output.zip")) -> dict:
+        """
+        Import the {subject}_{token}_result files of the zips as a run
+        named by the newest file date. Token names are looked up in
+        erc20_data, unknown names are reported and skipped.
+        """
+        by_name = {name: int(cmc_id) for name, cmc_id in
+                   zip(erc20_data["name"], erc20_data["id"])}
+        subjects = [*SUBJECT_FIELDS, "all"]
+        pattern = re.compile(rf"^(?:text|json)_output/({'|'.join(subjects)})"
+                             r"_(.+)_result\.(txt|json)$")
+        rows, unknown, newest = [], set(), (1980, 1, 1, 0, 0, 0)
+        for archive in (text_zip, json_zip):
+            with zipfile.ZipFile(archive) as z:
+                for info in z.infolist():
+                    match = pattern.match(info.filename)
+                    if match is None:
+                        continue
+                    subject, token, suffix = match.groups()
+                    if token not in by_name:
+                        unknown.add(token)
+                        continue
+                    stage = ("extract" if suffix == "json" else
+                             "research_batch" if subject == "all"
+                             else "research")
+                    rows.append((stage, by_name[token], subject, token,
+                                 z.read(info).decode("utf-8")))
+                    newest = max(newest, info.date_time)
+
+        current = self.run
+        run = self.start_run(datetime(*newest).strftime(RUN_FORMAT))
+        imported = self.put_many(rows, run=run)
+        # an import of old outputs does not replace the current run
+        self.run = max(current or run, run)
+        return {"run": run, "imported": imported,
+                "unknown": sorted(unknown)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Artifact store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("import", help="import the output zips")
+    add.add_argument("text_zip", nargs="?",
+                     default=Path("data/text_output.zip"), type=Path)
+    add.add_argument("json_zip", nargs="?",
+                     default=Path("data/json_output.zip"), type=Path)
+    add.add_argument("--tokens", type=Path,
+                     default=Path("data/erc20_data/erc20_data.csv"))
+    commands.add_parser("runs", help="list the runs")
+    args = parser.parse_args()
+
+    store = ArtifactStore()
+    if args.command == "import":
+        result = store.import_zips(pd.read_csv(args.tokens), args.text_zip,
+                                   args.json_zip)
+        print(f"imported {result['imported']} artifacts as run "
+              f"{result['run']}")
+        if result["unknown"]:
+            print(f"not in the token list: {', '.join(result['unknown'])}")
+    else:
+        for run in store.runs():
+            print(run)
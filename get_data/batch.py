@@ -0,0 +1,297 @@
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from pydantic import ValidationError
+from extraction import extract_local, extraction_stats
+from functions import (extract_data, extract_input, extract_key,
+                       save_result)
+from models import pydantic_class
+from telemetry import track
+
+"""
+Extraction of all research outputs with the OpenAI Batch API.
+
+Instead of one responses.parse call per token and subject, the agent
+outputs that the local extraction cannot handle are written into one JSONL
+file, uploaded and run as a batch. The batch is polled until it is done
+and the extract artifacts are written from its output.
+Batches cost half of the interactive calls and do not count against the
+rate limit of the agents. Requests are identified by subject and CMC id.
+The ids of a submitted batch are kept in data/batch/state.json with the
+artifact run, so an interrupted run waits for the same batch instead of
+submitting it again; the batch of another run is discarded.
+"""
+
+# limit of the Batch API per file
+MAX_REQUESTS = 50000
+DONE = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchExtraction:
+    """
+    Collects, submits and reads back the extraction batch of a run.
+    Requests that fail or do not validate are retried with extract_data.
+    """
+
+    def __init__(self, session, subjects: list[str], cache=None,
+                 router=None, telemetry=None,
+                 directory: Path = Path("data/batch"),
+                 poll_interval: float = 30.0):
+        self.session = session
+        self.subjects = subjects
+        self.cache = cache
+        self.router = router
+        self.telemetry = telemetry
+        self.directory = Path(directory)
+        self.state_path = self.directory / "state.json"
+        self.poll_interval = poll_interval
+        self.stats = {"local": 0, "cached": 0, "submitted": 0, "done": 0,
+                      "retried": 0, "failed": 0}
+
+    def models(self, subject: str) -> list[str]:
+        return (self.router.models("extract", subject) if self.router
+                else ["gpt-4o"])
+
+    def request(self, custom_id: str) -> tuple[str, int | None]:
+        """
+        Subject and token position of a request, None if the token is no
+        longer in the token list.
+        """
+        subject, cmc_id = custom_id.rsplit("/", 1)
+        try:
+            return subject, self.session.token_loc(cmc_id=int(cmc_id))
+        except KeyError:
+            return subject, None
+
+    def state(self) -> dict | None:
+        """
+        The submitted batches of the current run. A state file of another
+        run is removed, its outputs are not the ones of this run.
+        """
+        if not self.state_path.exists():
+            return None
+        state = json.loads(self.state_path.read_text(encoding="utf-8"))
+        if state.get("run") != self.session.artifacts.run:
+            print(f"discarding the batches of run {state.get('run')}")
+            self.state_path.unlink()
+            return None
+        return state
+
+    def collect(self) -> list[dict]:
+        """
+        Batch requests of all agent outputs that are neither extracted
+        locally nor cached, the others are written right away.
+        """
+        # all agent outputs of the run in one scan
+        outputs = {(cmc_id, subject): content for cmc_id, subject, _, content
+                   in self.session.artifacts.scan("research", latest=True)}
+        requests = []
+        for token_loc in range(1, len(self.session.erc20_data) + 1):
+            token = self.session.token(token_loc)
+            cmc_id = self.session.cmc_id(token_loc)
+            for subject in self.subjects:
+                agent_output = outputs.get((cmc_id, subject))
+                if agent_output is None:
+                    continue
+                ModelClass = pydantic_class(subject)
+
+                parsed_output = extract_local(agent_output, ModelClass,
+                                              token)
+                extraction_stats.record(parsed_output is not None)
+                if parsed_output is None and self.cache:
+                    cached = self.cache.get(extract_key(
+                        subject, token_loc, agent_output,
+                        self.models(subject), self.session))
+                    if cached is not None:
+                        parsed_output = ModelClass.model_validate_json(
+                            cached)
+                        self.stats["cached"] += 1
+                elif parsed_output is not None:
+                    self.stats["local"] += 1
+                if parsed_output is not None:
+                    save_result(subject, token_loc, parsed_output,
+                                self.session)
+                    continue
+
+                # the first model of the route, extract_data escalates
+                requests.append({
+                    "custom_id": f"{subject}/{cmc_id}",
+                    "method": "POST",
+                    "url": "/v1/responses",
+                    "body": {
+                        "model": self.models(subject)[0],
+                        "input": extract_input(agent_output),
+                        # the same format as responses.parse
+                        "text": {"format": text_format(ModelClass)},
+                        "prompt_cache_key": f"tokenomics-extract-{subject}"
+                    }
+                })
+        return requests
+
+    def submit(self, requests: list[dict]) -> list[dict]:
+        """
+        Upload the requests and create the batches, returns their ids and
+        the custom_ids of their requests.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        batches = []
+        for n, start in enumerate(range(0, len(requests), MAX_REQUESTS)):
+            path = self.directory / f"extract-{int(time.time())}-{n}.jsonl"
+            with path.open("w", encoding="utf-8") as f:
+                for request in requests[start:start + MAX_REQUESTS]:
+                    f.write(json.dumps(request) + "\n")
+            with path.open("rb") as f:
+                upload = self.session.openai.files.create(file=f,
+                                                          purpose="batch")
+            batch = self.session.openai.batches.create(
+                input_file_id=upload.id, endpoint="/v1/responses",
+                completion_window="24h",
+                metadata={"stage": "extract"})
+            batches.append({"id": batch.id, "requests": [
+                r["custom_id"] for r in requests[start:start + MAX_REQUESTS]]})
+            print(f"submitted batch {batch.id} with "
+                  f"{len(batches[-1]['requests'])} requests")
+        self.stats["submitted"] += len(requests)
+        self.state_path.write_text(
+            json.dumps({"run": self.session.artifacts.run,
+                        "batches": batches}), encoding="utf-8")
+        return batches
+
+    def wait(self, batch_id: str):
+        """
+        Poll the batch until it finished, failed or expired.
+        """
+        while True:
+            batch = self.session.openai.batches.retrieve(batch_id)
+            if batch.status in DONE:
+                return batch
+            counts = batch.request_counts
+            print(f"batch {batch_id} {batch.status}"
+                  + (f" {counts.completed + counts.failed}/{counts.total}"
+                     if counts else ""))
+            time.sleep(self.poll_interval)
+
+    def lines(self, file_id: str | None) -> list[dict]:
+        if file_id is None:
+            return []
+        text = self.session.openai.files.content(file_id).text
+        return [json.loads(line) for line in text.splitlines()
+                if line.strip()]
+
+    def read(self, batch) -> set[str]:
+        """
+        Write the results of a finished batch, returns the custom_ids with
+        a valid result. An expired batch has results for a part only.
+        """
+        done = set()
+        for line in self.lines(batch.output_file_id):
+            subject, token_loc = self.request(line["custom_id"])
+            result = line.get("response") or {}
+            if (token_loc is None or line.get("error")
+                    or result.get("status_code") != 200):
+                continue
+            token = self.session.token(token_loc)
+
+            with track(self.telemetry, stage="extract_batch",
+                       subject=subject, token=token,
+                       model=self.models(subject)[0], attempt=0,
+                       batch=True) as call:
+                call.start()
+                call.add_usage(usage(result["body"]))
+            try:
+                parsed_output = pydantic_class(subject) \
+                    .model_validate_json(output_text(result["body"]))
+            except ValidationError:
+                continue
+            save_result(subject, token_loc, parsed_output, self.session)
+            if self.cache:
+                agent_output = self.session.artifacts.get(
+                    "research", self.session.cmc_id(token_loc), subject)
+                self.cache.set(extract_key(subject, token_loc, agent_output,
+                                           self.models(subject),
+                                           self.session),
+                               parsed_output.model_dump_json())
+            self.stats["done"] += 1
+            done.add(line["custom_id"])
+        return done
+
+    def run(self) -> dict:
+        """
+        Extract everything, resuming a submitted batch if there is one.
+        """
+        state = self.state()
+        if state is not None:
+            batches = state["batches"]
+            print(f"resuming batches "
+                  f"{', '.join(b['id'] for b in batches)}")
+        else:
+            requests = self.collect()
+            batches = self.submit(requests) if requests else []
+
+        missing = []
+        for entry in batches:
+            batch = self.wait(entry["id"])
+            print(f"batch {batch.id} {batch.status}")
+            done = self.read(batch)
+            missing += [r for r in entry["requests"] if r not in done]
+        self.state_path.unlink(missing_ok=True)
+
+        # answers that failed or do not validate go the interactive way
+        for custom_id in missing:
+            subject, token_loc = self.request(custom_id)
+            if token_loc is None:
+                print(f"extract {custom_id} skipped, not in the token list")
+                self.stats["failed"] += 1
+                continue
+            try:
+                extract_data(subject, token_loc, cache=self.cache,
+                             session=self.session, telemetry=self.telemetry,
+                             router=self.router)
+                self.stats["retried"] += 1
+            except Exception as e:
+                print(f"extract {custom_id} failed: {e}")
+                self.stats["failed"] += 1
+        return self.stats
+
+
+def strict_schema(schema: dict) -> dict:
+    """
+    Structured outputs need every property required and no additional
+    properties in all objects of the schema.
+    """
+    if isinstance(schema, dict):
+        schema = {key: strict_schema(value) for key, value in schema.items()
+                  if key != "default"}
+        if schema.get("type") == "object" and "properties" in schema:
+            schema["required"] = list(schema["properties"])
+            schema["additionalProperties"] = False
+    elif isinstance(schema, list):
+        schema = [strict_schema(value) for value in schema]
+    return schema
+
+
+def text_format(ModelClass) -> dict:
+    """
+    The text format that responses.parse sends for the pydantic class.
+    """
+    return {"type": "json_schema", "strict": True,
+            "name": ModelClass.__name__,
+            "schema": strict_schema(ModelClass.model_json_schema())}
+
+
+def output_text(body: dict) -> str:
+    """
+    Text of the message in a Responses API answer of a batch.
+    """
+    return "".join(part.get("text", "")
+                   for item in body.get("output", [])
+                   if item.get("type") == "message"
+                   for part in item.get("content", [])
+                   if part.get("type") == "output_text")
+
+
+def usage(body: dict):
+    # attribute access like the usage of the client, see Call.add_usage
+    return json.loads(json.dumps(body.get("usage")),
+                      object_hook=lambda d: SimpleNamespace(**d))
@@ -0,0 +1,62 @@
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from flags import FlagMatrix  # noqa: E402
+
+"""
+Benchmark of the flag queries from 50 to 50,000 tokens.
+
+The tokens of data/result/erc20_full_data.csv are repeated to the size and
+one query is answered with pandas boolean masks on the merged data set and
+with the bit-packed FlagMatrix. Run from get_data:
+
+python benchmarks/bench_flags.py [sizes...]
+"""
+
+QUERY = ("DAO_Governance AND Smart_Contract_Audits "
+         "AND NOT Fixed_Supply_Hard_Cap")
+
+
+def pandas_query(df: pd.DataFrame) -> np.ndarray:
+    mask = ((df["DAO_Governance"] == 1) & (df["Smart_Contract_Audits"] == 1)
+            & (df["Fixed_Supply_Hard_Cap"] == 0))
+    return df.loc[mask, "id"].to_numpy()
+
+
+def best_of(function, repeat: int = 200) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(sizes):
+    data = pd.read_csv(Path("data/result/erc20_full_data.csv"))
+    print(f"{'tokens':>8} {'build ms':>9} {'pandas us':>10} "
+          f"{'query us':>9} {'count us':>9}")
+    for size in sizes:
+        df = pd.concat([data] * -(-size // len(data)),
+                       ignore_index=True).iloc[:size]
+        df["id"] = np.arange(size)
+
+        start = time.perf_counter()
+        flags = FlagMatrix.from_frame(df)
+        build = time.perf_counter() - start
+
+        assert (flags.query(QUERY) == pandas_query(df)).all()
+        print(f"{size:>8} {build * 1000:>9.2f} "
+              f"{best_of(lambda: pandas_query(df)) * 1e6:>10.1f} "
+              f"{best_of(lambda: flags.query(QUERY)) * 1e6:>9.1f} "
+              f"{best_of(lambda: flags.count(QUERY)) * 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [50, 500, 5000, 50000]
+    run(sizes)
@@ -0,0 +1,115 @@
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from artifacts import ArtifactStore  # noqa: E402
+from merge import read_results, merge_results  # noqa: E402
+from models import SUBJECT_FIELDS  # noqa: E402
+
+"""
+Benchmark of the merge step from 50 to 5,000 tokens.
+
+Synthetic results are generated from the recorded results in
+data/json_output.zip and merged with the previous per-file DataFrame merge
+of result files and with the columnar merge engine, which reads them from
+the artifact store in one scan. Run from get_data:
+
+python benchmarks/bench_merge.py [sizes...]
+"""
+
+tokenomics_subjects = list(SUBJECT_FIELDS)
+
+
+def template_records() -> dict:
+    """
+    One recorded result per subject to copy for the synthetic tokens.
+    """
+    import zipfile
+    archive = Path("data/json_output.zip")
+    records = {}
+    with zipfile.ZipFile(archive) as z:
+        for subject in tokenomics_subjects:
+            name = f"json_output/{subject}_Aave_result.json"
+            records[subject] = json.loads(z.read(name))["tokens"][0]
+    return records
+
+
+def write_results(json_dir: Path, tokens, records: dict):
+    for token in tokens:
+        for subject, record in records.items():
+            data = {"tokens": [dict(record, Token=token)]}
+            (json_dir / f"{subject}_{token}_result.json").write_text(
+                json.dumps(data), encoding="utf-8")
+
+
+def store_results(artifacts: ArtifactStore, erc20_data: pd.DataFrame,
+                  records: dict):
+    artifacts.put_many(
+        ("extract", cmc_id, subject, token,
+         json.dumps({"tokens": [dict(record, Token=token)]}))
+        for cmc_id, token in zip(erc20_data["id"], erc20_data["name"])
+        for subject, record in records.items())
+
+
+def legacy_merge(erc20_data: pd.DataFrame, json_dir: Path) -> pd.DataFrame:
+    """
+    The merge of main.py before the columnar engine.
+    """
+    all_token_dfs = []
+    for token in erc20_data["name"]:
+        subject_dfs = []
+        for subject in tokenomics_subjects:
+            file_path = json_dir / f"{subject}_{token}_result.json"
+            with open(file_path, "r", encoding="utf-8") as f:
+                json_data = json.load(f)
+            df = pd.DataFrame(json_data["tokens"])
+            if subject == "class":
+                df = df.rename(columns={"Token": "name"})
+            else:
+                df = df.drop(columns="Token")
+            if subject == "price_and_market":
+                df = df.rename(columns={
+                    "Inflationary_Supply":
+                        "Inflationary_Supply_Price_and_Market"
+                })
+            subject_dfs.append(df)
+        all_token_dfs.append(pd.concat(subject_dfs, axis=1))
+    df_all_subjects = pd.concat(all_token_dfs, axis=0, ignore_index=True)
+    return erc20_data.merge(df_all_subjects, how="left", on="name")
+
+
+def run(sizes):
+    records = template_records()
+    print(f"{'tokens':>8} {'legacy s':>10} {'columnar s':>11} {'speedup':>8}")
+    for size in sizes:
+        tokens = [f"Token_{i}" for i in range(size)]
+        erc20_data = pd.DataFrame({"id": range(size), "name": tokens})
+        with tempfile.TemporaryDirectory() as tmp:
+            json_dir = Path(tmp)
+            write_results(json_dir, tokens, records)
+            artifacts = ArtifactStore(json_dir / "artifacts.sqlite")
+            artifacts.start_run()
+            store_results(artifacts, erc20_data, records)
+
+            start = time.perf_counter()
+            legacy_merge(erc20_data, json_dir)
+            legacy = time.perf_counter() - start
+
+            start = time.perf_counter()
+            merge_results(erc20_data, tokenomics_subjects,
+                          read_results(artifacts, tokenomics_subjects))
+            columnar = time.perf_counter() - start
+            artifacts.conn.close()
+
+        print(f"{size:>8} {legacy:>10.3f} {columnar:>11.3f} "
+              f"{legacy / columnar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1:]] or [50, 500, 1000, 5000]
+    run(sizes)
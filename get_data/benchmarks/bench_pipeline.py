@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agents import set_tracing_disabled  # noqa: E402
+from cmc import get_erc20  # noqa: E402
+from extraction import extraction_stats  # noqa: E402
+from functions import (research_agent, research_agent_batch,  # noqa: E402
+                       extract_data)
+from mock_cmc import MockCMCServer, make_listings  # noqa: E402
+from mock_openai import MockOpenAIServer, load_recordings  # noqa: E402
+from process_supply import build_charts  # noqa: E402
+from scheduler import RateLimiter, run_jobs  # noqa: E402
+from session import PipelineSession  # noqa: E402
+import main  # noqa: E402
+
+"""
+End-to-end benchmark of the pipeline against local stand-ins.
+
+CoinMarketCap is replaced by mock_cmc.py, the OpenAI Responses API by
+mock_openai.py, which replays the recorded outputs of data/text_output.zip
+and data/json_output.zip with the given latency and error rate. Every stage
+is timed: get_erc20, research_agent, extract_data, the merge of main.py and
+process_supply. With --batched the research runs as in
+RESEARCH_MODE=batched, one agent run per token for all subjects and no
+extract_data step. The results are appended to
+benchmarks/results/pipeline.jsonl and compared with the earlier runs of the
+same size and settings. Run from get_data:
+
+python benchmarks/bench_pipeline.py [sizes...] [--latency 0.05] [--batched]
+    [--check]
+"""
+
+GET_DATA = Path(__file__).resolve().parents[1]
+RESULTS = Path(__file__).resolve().parent / "results" / "pipeline.jsonl"
+STAGES = ["get_erc20", "research_agent", "extract_data", "merge",
+          "process_supply"]
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              cwd=GET_DATA, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    # the pipeline reports every job, keep the benchmark output readable
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        yield
+
+
+def timed(timings: dict, stage: str, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[stage] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def bench(size: int, config: dict, recordings: dict) -> dict:
+    """
+    Run the whole pipeline for `size` tokens in a temporary folder.
+    """
+    workdir = Path.cwd()
+    listings = make_listings(count=max(1000, int(size / 0.3 * 1.5)))
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp, \
+            MockCMCServer(listings) as cmc, \
+            MockOpenAIServer(recordings, GET_DATA / "instructions",
+                             research_latency=config["latency"],
+                             extract_latency=config["latency"] / 4,
+                             error_rate=config["error_rate"]) as openai:
+        os.chdir(tmp)
+        try:
+            for folder in ("erc20_data", "result"):
+                Path("data", folder).mkdir(parents=True)
+            os.environ.update({
+                "CMC_BASE_URL": cmc.base_url,
+                "OPENAI_BASE_URL": openai.base_url,
+                # relative, so every size writes into its own folder
+                "RESULT_DIR": "data/result",
+                "FRONTEND_DATA_DIR": "frontend"
+            })
+
+            erc20_data = timed(timings, "get_erc20", get_erc20, "bench",
+                               size)
+            erc20_data["name"] = erc20_data["name"].str.replace(" ", "_")
+            token_file = Path("data/erc20_data/erc20_data.csv")
+            erc20_data.to_csv(token_file, index=False, encoding="utf-8")
+
+            session = PipelineSession(token_file, GET_DATA / "instructions")
+            session.openai_api_key = "bench"
+            session.artifacts.start_run()
+            # the mock does not limit, only the client side is measured
+            limiter = RateLimiter(rpm=10 ** 9, tpm=10 ** 12)
+            jobs = [(loc, subject)
+                    for loc in range(1, len(erc20_data) + 1)
+                    for subject in main.tokenomics_subjects]
+
+            async def research(job):
+                await research_agent(job[1], job[0], limiter=limiter,
+                                     session=session)
+
+            async def extract(job):
+                await asyncio.to_thread(extract_data, job[1], job[0],
+                                        limiter=limiter, session=session)
+
+            async def research_batch(job):
+                await research_agent_batch(job[0], main.tokenomics_subjects,
+                                           limiter=limiter, session=session)
+
+            stages = (("research_agent", research),
+                      ("extract_data", extract))
+            if config.get("batched"):
+                # one job per token, the results need no extraction
+                jobs = [(loc, "all") for loc in range(1, len(erc20_data) + 1)]
+                stages = (("research_agent", research_batch),)
+                timings["extract_data"] = 0.0
+
+            local_before = extraction_stats.local
+            summaries = {}
+            with quiet(not config["verbose"]):
+                for stage, worker in stages:
+                    summaries[stage] = timed(
+                        timings, stage, asyncio.run,
+                        run_jobs(jobs, worker, config["concurrency"],
+                                 limiter, requests_per_job=0))
+                full_data = timed(timings, "merge", main.merge, erc20_data,
+                                  session.artifacts)
+                timed(timings, "process_supply", build_charts, full_data)
+            session.close()
+        finally:
+            os.chdir(workdir)
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit(),
+        "size": size,
+        "config": {k: v for k, v in config.items() if k != "verbose"},
+        "stages": timings,
+        "failed_jobs": sum(s["failed"] for s in summaries.values()),
+        "local_extraction": extraction_stats.local - local_before,
+        "calls": dict(openai.calls, cmc=cmc.calls)
+    }
+
+
+def history(path: Path, size: int, config: dict) -> list[dict]:
+    if not path.exists():
+        return []
+    runs = [json.loads(line) for line in
+            path.read_text(encoding="utf-8").splitlines() if line.strip()]
+    return [run for run in runs if run["size"] == size
+            and run["config"] == config]
+
+
+def compare(result: dict, previous: list[dict], threshold: float) -> list:
+    """
+    Stages slower than the median of the last five runs by more than
+    threshold (a fraction).
+    """
+    regressions = []
+    print(f"\n{result['size']} tokens, {result['failed_jobs']} failed jobs, "
+          f"{result['local_extraction']} local extractions, "
+          f"calls {result['calls']}")
+    print(f"{'stage':>16} {'seconds':>9} {'baseline':>9} {'change':>8}")
+    for stage in STAGES:
+        seconds = result["stages"][stage]
+        baseline = [run["stages"][stage] for run in previous[-5:]]
+        if not baseline:
+            print(f"{stage:>16} {seconds:>9.3f} {'-':>9} {'-':>8}")
+            continue
+        median = statistics.median(baseline)
+        change = seconds / median - 1 if median else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append((result["size"], stage, change))
+        print(f"{stage:>16} {seconds:>9.3f} {median:>9.3f} "
+              f"{change * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def run(args) -> int:
+    set_tracing_disabled(True)
+    recordings = load_recordings(GET_DATA / "data" / "text_output.zip",
+                                 GET_DATA / "data" / "json_output.zip")
+    config = {"latency": args.latency, "error_rate": args.error_rate,
+              "concurrency": args.concurrency, "verbose": args.verbose}
+    if args.batched:
+        config["batched"] = True
+
+    regressions = []
+    for size in args.sizes:
+        result = bench(size, config, recordings)
+        previous = history(args.results, size, result["config"])
+        regressions += compare(result, previous, args.threshold)
+        if not args.no_save:
+            args.results.parent.mkdir(parents=True, exist_ok=True)
+            with args.results.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+
+    for size, stage, change in regressions:
+        print(f"regression: {stage} at {size} tokens {change * 100:+.1f}%")
+    return 1 if args.check and regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmark against local stand-ins")
+    parser.add_argument("sizes", nargs="*", type=int,
+                        default=[50, 500, 5000])
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="mean seconds of an agent run")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown that counts as regression")
+    parser.add_argument("--results", type=Path, default=RESULTS)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with 1 on a regression")
+    parser.add_argument("--batched", action="store_true",
+                        help="research all subjects of a token at once")
+    parser.add_argument("--verbose", action="store_true")
+    sys.exit(run(parser.parse_args()))
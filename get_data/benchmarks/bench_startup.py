@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+"""
+Startup time of the command line.
+
+Every case runs in a fresh interpreter, timed from the start of the
+process to its exit, and reports which heavy packages it loaded. The supply
+stage must run without the OpenAI and agents packages. Run from get_data:
+
+python benchmarks/bench_startup.py [--runs 5] [--check]
+"""
+
+GET_DATA = Path(__file__).resolve().parents[1]
+HEAVY = ["agents", "openai", "pandas", "numpy"]
+
+# run the command, then list the heavy packages it imported
+RUNNER = """
+import sys
+sys.path.insert(0, {path!r})
+import cli
+try:
+    cli.main({argv!r})
+finally:
+    print("MODULES " + " ".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+CASES = {
+    "python (empty)": "pass",
+    "import agents": "import agents",
+    "cli --help": ["--help"],
+    "cli research --help": ["research", "--help"],
+    "cli supply": ["supply"],
+    "cli merge --help": ["merge", "--help"],
+}
+
+
+def run_case(case, workdir: Path, env: dict) -> tuple[float, list[str]]:
+    if isinstance(case, str):
+        code = case
+    else:
+        code = RUNNER.format(path=str(GET_DATA), argv=case, heavy=HEAVY)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=workdir,
+                            env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    modules = []
+    for line in result.stdout.splitlines():
+        if line.startswith("MODULES"):
+            modules = line.split()[1:]
+    return seconds, modules
+
+
+def run(args) -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        result_dir = workdir / "data" / "result"
+        result_dir.mkdir(parents=True)
+        shutil.copy(GET_DATA / "data" / "result" / "erc20_full_data.csv",
+                    result_dir)
+        env = dict(os.environ, RESULT_DIR=str(result_dir),
+                   FRONTEND_DATA_DIR="off")
+
+        print(f"{'case':<22} {'median s':>9} {'min s':>7}  heavy modules")
+        results = {}
+        for name, case in CASES.items():
+            timings, modules = [], []
+            for _ in range(args.runs):
+                seconds, modules = run_case(case, workdir, env)
+                timings.append(seconds)
+            results[name] = {"median": statistics.median(timings),
+                             "min": min(timings), "modules": modules}
+            print(f"{name:<22} {results[name]['median']:>9.3f} "
+                  f"{min(timings):>7.3f}  {' '.join(modules) or '-'}")
+
+    supply = results["cli supply"]["modules"]
+    if "agents" in supply or "openai" in supply:
+        print("supply loaded the OpenAI/agents stack")
+        failed = True
+    print(json.dumps({name: round(r["median"], 3)
+                      for name, r in results.items()}))
+    return 1 if args.check and failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Startup time of the command line")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true",
+                        help="exit with 1 if supply loads agents/openai")
+    sys.exit(run(parser.parse_args()))
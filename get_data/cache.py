@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+"""
+Persistent cache for the agent and extraction responses.
+
+An entry is keyed by a hash over everything that decides the answer: the
+model, the instruction text, the prompt template and the token. Editing one
+instruction file therefore only invalidates the entries of that subject.
+Entries expire after a TTL and the least recently used ones are evicted when
+the cache grows over its size limits.
+"""
+
+
+def cache_key(**parts) -> str:
+    """
+    Content address of a request, a sha256 over its parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False,
+                         default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    One json file per entry under data/cache. The file mtime is the last
+    access and is used for the LRU eviction.
+    """
+
+    def __init__(self, directory: Path = Path("data/cache"),
+                 ttl: float = 30 * 24 * 3600,
+                 max_entries: int = 20000,
+                 max_bytes: int = 500 * 1024 * 1024,
+                 evict_every: int = 100):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if time.time() - entry["created"] > self.ttl:
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        self.hits += 1
+        return entry["value"]
+
+    def set(self, key: str, value: str):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"created": time.time(), "value": value}
+
+        # write to a temp file first so a crash never leaves half an entry,
+        # one per writer, the extraction threads may write the same key
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent,
+                                        prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        self.writes += 1
+        if self.writes % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then the least recently used ones until the
+        cache fits max_entries and max_bytes. Returns the number removed.
+        """
+        entries = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        now = time.time()
+        removed = 0
+        alive = []
+        for mtime, size, path in entries:
+            # mtime is refreshed on access, so this is a lower bound of age
+            if now - mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                alive.append((mtime, size, path))
+
+        alive.sort()
+        total_bytes = sum(size for _, size, _ in alive)
+        while alive and (len(alive) > self.max_entries
+                         or total_bytes > self.max_bytes):
+            _, size, path = alive.pop(0)
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+        return removed
+
+    def summary(self) -> str:
+        return f"cache: {self.hits} hits, {self.misses} misses"
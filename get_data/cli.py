@@ -0,0 +1,148 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+"""
+Command line of the pipeline, one subcommand per stage.
+
+python cli.py fetch [--limit 50]
+python cli.py research [--resume | --worker]
+python cli.py extract [--batch]
+python cli.py merge
+python cli.py supply [--data data/result/erc20_full_data.csv]
+python cli.py refresh
+
+Every stage is a function of its module and the subcommands import only
+what they need: fetch, merge, supply and refresh run without the OpenAI
+and agents packages, which are only loaded by research and extract.
+"""
+
+
+def fetch(args) -> int:
+    from get_erc20 import fetch_tokens
+    from session import PipelineSession
+
+    session = PipelineSession()
+    erc20_data = fetch_tokens(session, args.limit)
+    print(f"{len(erc20_data)} tokens saved to {session.token_file}")
+    session.close()
+    return 0
+
+
+def _session():
+    from session import PipelineSession
+
+    session = PipelineSession()
+    if session.erc20_data is None:
+        raise ValueError(f"Token list {session.token_file} not found, "
+                         "run fetch first")
+    return session
+
+
+def research(args) -> int:
+    import asyncio
+    import main
+
+    session = _session()
+    if args.resume:
+        asyncio.run(main.resume(session))
+    elif args.worker:
+        asyncio.run(main.worker(session))
+    else:
+        asyncio.run(main.main(session))
+    # the batch extraction runs once, after the last research job
+    if os.getenv("EXTRACT_MODE") == "batch" and not args.worker:
+        main.extract_batch(session)
+    session.close()
+    return 0
+
+
+def extract(args) -> int:
+    import asyncio
+    import main
+
+    session = _session()
+    if args.batch or os.getenv("EXTRACT_MODE") == "batch":
+        main.extract_batch(session)
+    else:
+        asyncio.run(main.extract(session))
+    session.close()
+    return 0
+
+
+def merge(args) -> int:
+    import main
+
+    session = _session()
+    main.merge(session.erc20_data, session.artifacts)
+    session.close()
+    return 0
+
+
+def supply(args) -> int:
+    import pandas as pd
+    from process_supply import build_charts
+    from sink import default_sink
+
+    build_charts(pd.read_csv(args.data))
+    print(default_sink().summary())
+    return 0
+
+
+def refresh(args) -> int:
+    from refresh import print_changes, refresh as refresh_market
+    from sink import default_sink
+
+    print_changes(refresh_market(result_path=args.data))
+    print(default_sink().summary())
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Tokenomics data pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("fetch", help="token list from "
+                                                "CoinMarketCap")
+    command.add_argument("--limit", type=int, default=50)
+    command.set_defaults(run=fetch)
+
+    command = commands.add_parser("research", help="run the agents")
+    mode = command.add_mutually_exclusive_group()
+    mode.add_argument("--resume", action="store_true",
+                      help="continue the interrupted run")
+    mode.add_argument("--worker", action="store_true",
+                      help="join a run of another process")
+    command.set_defaults(run=research)
+
+    command = commands.add_parser("extract", help="extract the stored "
+                                                  "agent outputs again")
+    command.add_argument("--batch", action="store_true",
+                         help="with the Batch API")
+    command.set_defaults(run=extract)
+
+    command = commands.add_parser("merge", help="final data set, "
+                                                "summaries and history")
+    command.set_defaults(run=merge)
+
+    result = Path("data/result") / "erc20_full_data.csv"
+    command = commands.add_parser("supply", help="supply charts")
+    command.add_argument("--data", type=Path, default=result)
+    command.set_defaults(run=supply)
+
+    command = commands.add_parser("refresh", help="update the market "
+                                                  "numbers only")
+    command.add_argument("--data", type=Path, default=result)
+    command.set_defaults(run=refresh)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
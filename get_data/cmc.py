@@ -0,0 +1,274 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import pandas as pd
+import requests
+from scheduler import RateLimiter
+
+"""
+CoinMarketCap client.
+
+The listings are paged concurrently until enough ERC-20 tokens are found.
+Every request has a timeout, 429 and 5xx answers are retried with a
+backoff and the call rate and the credits of the plan are respected, set
+CMC_MAX_CREDITS to stop a run before it uses more credits. Set
+CMC_BASE_URL to run against the local mock server in mock_cmc.py.
+"""
+
+CMC_BASE_URL = "https://pro-api.coinmarketcap.com"
+
+# project links of the info endpoint, stored with the token list
+URL_COLUMNS = ["whitepaper_url", "website_url", "docs_url"]
+
+
+class CreditLimitError(RuntimeError):
+    pass
+
+
+def retry_after(value: str | None) -> float | None:
+    """
+    Seconds to wait from a Retry-After header, given in seconds or as an
+    HTTP date. None if the header is missing or cannot be read.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class CMCClient:
+    """
+    Pooled, rate limited access to the CoinMarketCap API.
+    """
+
+    def __init__(self, api_key: str, http: requests.Session | None = None,
+                 base_url: str | None = None, timeout: float = 10,
+                 max_retries: int = 5, calls_per_minute: int = 30,
+                 max_credits: int | None = None):
+        self.http = http or requests.Session()
+        self.headers = {"X-CMC_PRO_API_KEY": api_key,
+                        "Accepts": "application/json"}
+        self.base_url = (base_url or os.getenv("CMC_BASE_URL")
+                         or CMC_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # the basic plan allows 30 calls per minute
+        self.limiter = RateLimiter(rpm=calls_per_minute, tpm=calls_per_minute)
+        if max_credits is None and os.getenv("CMC_MAX_CREDITS"):
+            max_credits = int(os.getenv("CMC_MAX_CREDITS"))
+        self.max_credits = max_credits
+        self.credits = 0
+        self.lock = threading.Lock()
+
+    def get(self, path: str, params: dict, credits: int = 1) -> dict:
+        """
+        GET a CMC endpoint and return the parsed answer. `credits` is the
+        expected credit cost, checked against max_credits beforehand.
+        """
+        # reserve the credits, concurrent pages must not overshoot
+        with self.lock:
+            if (self.max_credits is not None
+                    and self.credits + credits > self.max_credits):
+                raise CreditLimitError(
+                    f"{path} would exceed the limit of {self.max_credits} "
+                    f"credits ({self.credits} used)")
+            self.credits += credits
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire_sync(tokens=0)
+            try:
+                response = self.http.get(self.base_url + path, params=params,
+                                         headers=self.headers,
+                                         timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(min(60, 2 ** attempt))
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                delay = retry_after(response.headers.get("Retry-After"))
+                if delay is None:
+                    delay = min(60, 2 ** attempt)
+                # hold back the other page requests as well
+                self.limiter.pause(delay)
+                continue
+
+            response.raise_for_status()
+            data = response.json()
+            charged = data.get("status", {}).get("credit_count", credits)
+            with self.lock:
+                self.credits += charged - credits
+            return data
+        raise RuntimeError(f"{path} failed after {self.max_retries} retries")
+
+    def listings(self, start: int, limit: int) -> list[dict]:
+        # 1 credit per 200 listings
+        data = self.get("/v1/cryptocurrency/listings/latest",
+                        {"start": start, "limit": limit, "convert": "USD"},
+                        credits=math.ceil(limit / 200))
+        return data["data"]
+
+    def batched(self, path: str, params: dict, ids, batch_size: int = 100,
+                concurrency: int = 4) -> list[dict]:
+        """
+        GET an endpoint for batch_size ids per request and return the
+        values of all answers.
+        """
+        ids = [int(i) for i in ids]
+        batches = [ids[i:i + batch_size]
+                   for i in range(0, len(ids), batch_size)]
+
+        def fetch(batch):
+            # 1 credit per 100 ids
+            data = self.get(path, dict(params, id=",".join(map(str, batch))),
+                            credits=math.ceil(len(batch) / 100))
+            return data["data"]
+
+        values = []
+        with ThreadPoolExecutor(concurrency) as pool:
+            for data in pool.map(fetch, batches):
+                for value in data.values():
+                    # v2 answers a list per key for ambiguous symbols
+                    values.extend(value if isinstance(value, list)
+                                  else [value])
+        return values
+
+    def quotes(self, ids, batch_size: int = 100,
+               concurrency: int = 4) -> list[dict]:
+        """
+        Latest quotes of the given CMC ids, batch_size ids per request.
+        """
+        return self.batched("/v2/cryptocurrency/quotes/latest",
+                            {"convert": "USD"}, ids, batch_size,
+                            concurrency)
+
+    def info(self, ids, batch_size: int = 100,
+             concurrency: int = 4) -> list[dict]:
+        """
+        Metadata of the given CMC ids, only the urls are requested.
+        """
+        return self.batched("/v2/cryptocurrency/info", {"aux": "urls"},
+                            ids, batch_size, concurrency)
+
+
+def market_row(c: dict) -> dict:
+    """
+    The market numbers of a listing or quote.
+    """
+    return {
+        "id": c["id"],
+        "price": c["quote"]["USD"]["price"],
+        "market_cap": c["quote"]["USD"]["market_cap"],
+        "circulating_supply": c["circulating_supply"],
+        "total_supply": c["total_supply"],
+        "max_supply": c["max_supply"]
+    }
+
+
+def erc20_row(c: dict) -> dict:
+    return {
+        "id": c["id"],
+        "symbol": c["symbol"],
+        "name": c["name"],
+        "price": c["quote"]["USD"]["price"],
+        "market_cap": c["quote"]["USD"]["market_cap"],
+        "circulating_supply": c["circulating_supply"],
+        "total_supply": c["total_supply"],
+        "max_supply": c["max_supply"],
+        "contract": c["platform"]["token_address"]
+    }
+
+
+def url_row(c: dict) -> dict:
+    """
+    Whitepaper, website and documentation link of an info entry. CMC
+    lists the whitepaper first under technical_doc, a second technical
+    document is usually the documentation site.
+    """
+    urls = c.get("urls") or {}
+    docs = urls.get("technical_doc") or []
+    websites = urls.get("website") or []
+    return {
+        "id": c["id"],
+        "whitepaper_url": docs[0] if docs else None,
+        "website_url": websites[0] if websites else None,
+        "docs_url": docs[1] if len(docs) > 1 else None
+    }
+
+
+def is_erc20(c: dict) -> bool:
+    return bool(c.get("platform")) and c["platform"]["slug"] == "ethereum"
+
+
+def fetch_erc20(client: CMCClient, limit: int = 50, page_size: int = 500,
+                concurrency: int = 4) -> pd.DataFrame:
+    """
+    Page through the listings until `limit` ERC-20 tokens are collected or
+    the listings end. After the first page the share of ERC-20 tokens is
+    used to request only as many further pages as needed, concurrently.
+    """
+    erc20 = []
+    start = 1
+    pages = 1
+    with ThreadPoolExecutor(concurrency) as pool:
+        while len(erc20) < limit:
+            starts = [start + i * page_size for i in range(pages)]
+            results = list(pool.map(
+                lambda s: client.listings(s, page_size), starts))
+
+            for page in results:
+                erc20.extend(erc20_row(c) for c in page if is_erc20(c))
+            start += pages * page_size
+            # end of the listings
+            if any(len(page) < page_size for page in results):
+                break
+
+            # pages still needed at the ERC-20 share seen so far
+            share = max(len(erc20) / (start - 1), 0.01)
+            missing = (limit - len(erc20)) / share
+            pages = min(concurrency, max(1, math.ceil(missing / page_size)))
+
+    if len(erc20) < limit:
+        print(f"only {len(erc20)} of {limit} ERC-20 tokens listed")
+    return pd.DataFrame(erc20[:limit])
+
+
+def add_urls(client: CMCClient, erc20_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Join the project links of the info endpoint onto the tokens by id, in
+    one request per 100 tokens. Tokens without info get empty links.
+    """
+    urls = (pd.DataFrame([url_row(c) for c in client.info(erc20_data["id"])],
+                         columns=["id"] + URL_COLUMNS)
+            .drop_duplicates("id"))
+    return erc20_data.merge(urls, how="left", on="id")
+
+
+def get_erc20(api_key: str, limit: int = 50,
+              http: requests.Session | None = None,
+              urls: bool = True) -> pd.DataFrame:
+    """
+    Top `limit` ERC-20 tokens by market cap, with their project links
+    unless urls is False.
+    """
+    client = CMCClient(api_key, http=http)
+    erc20_data = fetch_erc20(client, limit)
+    if urls and len(erc20_data):
+        erc20_data = add_urls(client, erc20_data)
+    return erc20_data
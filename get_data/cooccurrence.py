@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from aggregate import TOKENOMICS_SUBJECTS
+from flags import flag_matrix
+from sink import OutputSink, default_sink
+
+"""
+Co-occurrence of the categories across all subjects.
+
+The flags of all tokens form one (tokens x categories) 0/1 matrix X and
+the tokens with a result of the subject of each category a matrix K of
+the same shape. Every statistic comes from one matrix product of [X K],
+and a pair of categories is only compared on the tokens with results of
+both subjects:
+
+count  X'X     tokens with both categories
+pairs  K'K     tokens with results of both subjects
+a, b   X'K     tokens with the first (second) category among the pairs
+lift   count * pairs / (a * b)
+phi    (pairs * count - a * b) / sqrt(a (pairs - a) b (pairs - b))
+
+The market cap weighted versions use X'WX, K'WK and X'WK with the market
+caps on the diagonal of W, so a token counts with its share of the market
+cap instead of 1. The result is written as cooccurrence.json for the
+heatmap.
+"""
+
+
+def pair_statistics(flags: np.ndarray, known: np.ndarray,
+                    weights: np.ndarray | None = None) -> dict:
+    """
+    count, pairs, lift and phi matrices of the (tokens x categories)
+    flags. Pairs without tokens or without variance are NaN.
+    """
+    # one product of [X K] gives X'X, X'K and K'K
+    m = flags.shape[1]
+    z = np.hstack([flags, known]).astype(float)
+    gram = z.T @ (z if weights is None else z * weights[:, None])
+    count, a, pairs = gram[:m, :m], gram[:m, m:], gram[m:, m:]
+    b = a.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lift = count * pairs / (a * b)
+        phi = (pairs * count - a * b) / np.sqrt(
+            a * (pairs - a) * b * (pairs - b))
+    return {"count": count, "pairs": pairs, "lift": lift, "phi": phi}
+
+
+def to_rows(matrix: np.ndarray, digits: int) -> list:
+    # NaN and inf become null
+    rounded = np.round(matrix, digits).astype(object)
+    return np.where(np.isfinite(matrix), rounded, None).tolist()
+
+
+def cooccurrence(df: pd.DataFrame,
+                 subjects: list[str] = TOKENOMICS_SUBJECTS) -> dict:
+    """
+    Heatmap data of all category pairs, rows and columns in the order of
+    "columns". The weighted count and pairs are shares of the total market
+    cap.
+    """
+    columns, column_subjects, flags, known = flag_matrix(df, subjects)
+    market_cap = df["market_cap"].to_numpy(dtype=float)
+    market_cap = np.where(np.isfinite(market_cap), market_cap, 0)
+    weights = market_cap / market_cap.sum() if market_cap.sum() else \
+        market_cap
+
+    plain = pair_statistics(flags, known)
+    weighted = pair_statistics(flags, known, weights)
+    return {
+        "tokens": len(df),
+        "columns": columns,
+        "subjects": column_subjects,
+        "count": plain["count"].astype(np.int64).tolist(),
+        "pairs": plain["pairs"].astype(np.int64).tolist(),
+        "lift": to_rows(plain["lift"], 3),
+        "phi": to_rows(plain["phi"], 3),
+        "weighted": {name: to_rows(matrix, 4)
+                     for name, matrix in weighted.items()}
+    }
+
+
+def build_cooccurrence(df: pd.DataFrame,
+                       subjects: list[str] = TOKENOMICS_SUBJECTS,
+                       sink: OutputSink | None = None) -> dict:
+    """
+    Write cooccurrence.json to data/result and the frontend.
+    """
+    sink = sink or default_sink()
+    data = cooccurrence(df, subjects)
+    sink.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")),
+               result="cooccurrence.json", frontend="cooccurrence.json")
+    return data
+
+
+if __name__ == "__main__":
+    build_cooccurrence(
+        pd.read_csv(Path("./data/result/erc20_full_data.csv")))
+    print(default_sink().summary())
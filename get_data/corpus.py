@@ -0,0 +1,401 @@
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from html.parser import HTMLParser
+from io import BytesIO
+from pathlib import Path
+import numpy as np
+import requests
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pdf whitepapers need pypdf
+    PdfReader = None
+
+"""
+Local whitepaper corpus of the research agents.
+
+The whitepaper of a token is fetched or imported once, stored under
+data/corpus by the sha256 of its content and split into sections. Tokens
+are keyed by their CMC id like the jobs and artifacts, the commands also
+take a name of the token list. A BM25 keyword index over the sections
+picks the ones relevant to a tokenomics subject, so research_agent sends
+the model only these sections and needs no web search. A document is only
+re-processed when its content hash changes, a conditional request avoids
+downloading an unchanged one.
+
+python corpus.py import <token> <file or url> [--refresh]
+python corpus.py fetch [--refresh]
+python corpus.py show <token> <subject>
+"""
+
+# keywords of the sections each subject needs
+SUBJECT_QUERIES = {
+    "class": "token utility payment governance security stablecoin "
+             "asset backed collateral purpose use case classification",
+    "governance": "governance voting proposal dao vote holders council "
+                  "multisig on-chain off-chain decision upgrade",
+    "distribution": "distribution allocation team investors community "
+                    "treasury foundation ecosystem airdrop sale percent",
+    "emissiontype": "emission supply mint minting burn inflation "
+                    "deflation fixed maximum cap schedule issuance",
+    "incentive": "incentive rewards staking yield liquidity mining fees "
+                 "rebate validators delegators apr",
+    "price_and_market": "price market liquidity exchange listing "
+                        "stability peg oracle buyback trading volume",
+    "risk_and_security": "risk security audit vulnerability attack "
+                         "exploit insurance bug bounty admin keys custody",
+    "vesting_and_cliff": "vesting cliff unlock lockup lock schedule "
+                         "months linear release team investors period"
+}
+
+# words without meaning for the ranking
+STOP_WORDS = set("""a an and are as at be by for from has have in is it its
+of on or that the this to was were which will with""".split())
+
+# target length of a section in characters
+CHUNK_CHARS = 1200
+
+
+class DocumentStore:
+    """
+    Documents and their sections under data/corpus: documents/{sha}.txt,
+    chunks/{sha}.json and tokens.json, which maps the CMC id of a token to
+    the hash, source and HTTP validators of its whitepaper.
+    """
+
+    def __init__(self, directory: Path = Path("data/corpus")):
+        self.directory = Path(directory)
+        self.tokens_path = self.directory / "tokens.json"
+        self.tokens = (json.loads(self.tokens_path.read_text(
+            encoding="utf-8")) if self.tokens_path.exists() else {})
+        # indexes of the documents used in this run, by hash
+        self.indexes = {}
+
+    def _save_tokens(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.tokens_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.tokens, indent=2,
+                                       sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, self.tokens_path)
+
+    def sha(self, cmc_id: int) -> str | None:
+        entry = self.tokens.get(str(cmc_id))
+        return entry["sha256"] if entry else None
+
+    def store(self, cmc_id: int, source: str, raw: bytes,
+              validators: dict | None = None) -> bool:
+        """
+        Register the raw document of a token. Text extraction and chunking
+        only run for content that is not stored yet. True if the document
+        of the token changed.
+        """
+        sha = hashlib.sha256(raw).hexdigest()
+        chunks_path = self.directory / "chunks" / f"{sha}.json"
+        if not chunks_path.exists():
+            text = document_text(raw, source)
+            if not text.strip():
+                raise ValueError(f"No text found in {source}")
+            for folder, name, payload in (
+                    ("documents", f"{sha}.txt", text),
+                    ("chunks", f"{sha}.json",
+                     json.dumps(split_sections(text)))):
+                path = self.directory / folder / name
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(payload, encoding="utf-8")
+
+        changed = self.sha(cmc_id) != sha
+        # json keys are strings
+        self.tokens[str(cmc_id)] = {"sha256": sha, "source": source,
+                                    "fetched": int(time.time()),
+                                    **(validators or {})}
+        self._save_tokens()
+        return changed
+
+    def import_file(self, cmc_id: int, path: Path) -> bool:
+        path = Path(path)
+        return self.store(cmc_id, str(path), path.read_bytes())
+
+    def fetch(self, cmc_id: int, url: str, refresh: bool = False,
+              http: requests.Session | None = None) -> bool:
+        """
+        Download the whitepaper of a token unless it is already stored
+        from the same url. With refresh an unchanged document is detected
+        by its ETag/Last-Modified or its hash. True if it changed.
+        """
+        entry = self.tokens.get(str(cmc_id))
+        if entry and entry["source"] == url and not refresh:
+            return False
+
+        headers = {}
+        if entry and entry["source"] == url:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        # no shared session, its headers carry the CMC key
+        response = (http or requests).get(url, headers=headers, timeout=60)
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+        validators = {key: response.headers[header] for key, header in
+                      (("etag", "ETag"), ("last_modified", "Last-Modified"))
+                      if header in response.headers}
+        return self.store(cmc_id, url, response.content, validators)
+
+    def index(self, sha: str) -> "BM25":
+        if sha not in self.indexes:
+            path = self.directory / "chunks" / f"{sha}.json"
+            chunks = json.loads(path.read_text(encoding="utf-8"))
+            self.indexes[sha] = BM25(chunks)
+        return self.indexes[sha]
+
+    def sections(self, cmc_id: int, subjects: list[str], top: int = 6,
+                 max_chars: int = 8000) -> str | None:
+        """
+        The best sections of the whitepaper of a token for the subjects,
+        at most max_chars long and in document order, or None if the
+        token has no document or none of its sections matches.
+        """
+        sha = self.sha(cmc_id)
+        if sha is None:
+            return None
+        index = self.index(sha)
+        # best sections of every subject first, then the runners-up
+        ranked = [index.search(SUBJECT_QUERIES[subject], top)
+                  for subject in subjects]
+        picked = []
+        for rank in range(top):
+            for hits in ranked:
+                if rank < len(hits) and hits[rank] not in picked:
+                    picked.append(hits[rank])
+
+        sections, length = [], 0
+        for i in picked:
+            length += len(index.chunks[i]["text"])
+            if sections and length > max_chars:
+                break
+            sections.append(i)
+        if not sections:
+            return None
+        return "\n\n".join(
+            f"## {index.chunks[i]['heading']}\n{index.chunks[i]['text']}"
+            if index.chunks[i]["heading"] else index.chunks[i]["text"]
+            for i in sorted(sections))
+
+
+class BM25:
+    """
+    Okapi BM25 ranking of the sections of one document.
+    """
+
+    def __init__(self, chunks: list[dict], k1: float = 1.5,
+                 b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.terms = [Counter(terms(f"{c['heading']} {c['text']}"))
+                      for c in chunks]
+        self.lengths = np.array([sum(t.values()) for t in self.terms],
+                                dtype=float)
+        self.avg_length = self.lengths.mean() if len(chunks) else 0.0
+        frequency = Counter(term for t in self.terms for term in t)
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+                    for term, df in frequency.items()}
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.chunks))
+        if not self.chunks:
+            return scores
+        norm = self.k1 * (1 - self.b + self.b * self.lengths
+                          / self.avg_length)
+        for term in set(terms(query)):
+            if term not in self.idf:
+                continue
+            tf = np.array([t[term] for t in self.terms], dtype=float)
+            scores += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str, top: int = 5) -> list[int]:
+        """
+        Positions of the best sections with a score above zero.
+        """
+        scores = self.scores(query)
+        best = np.argsort(-scores, kind="stable")[:top]
+        return [int(i) for i in best if scores[i] > 0]
+
+
+def token_id(token: str, token_file: Path) -> int:
+    """
+    CMC id of a token given by its id or by its name in the token list.
+    """
+    if token.isdigit():
+        return int(token)
+    with token_file.open(encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if row["name"] == token:
+                return int(row["id"])
+    raise ValueError(f"{token} is not in {token_file}, use its CMC id")
+
+
+def terms(text: str) -> list[str]:
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower())
+            if word not in STOP_WORDS and len(word) > 1]
+
+
+class _TextParser(HTMLParser):
+    # text of a html page without scripts and styles
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style", "nav", "footer"):
+            self.skip += 1
+        elif tag in ("p", "div", "br", "li", "tr", "section") \
+                or re.fullmatch(r"h[1-6]", tag):
+            self.parts.append("\n")
+            if re.fullmatch(r"h[1-6]", tag):
+                self.parts.append("# ")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style", "nav", "footer") and self.skip:
+            self.skip -= 1
+        elif tag in ("p", "div", "li", "tr", "section") \
+                or re.fullmatch(r"h[1-6]", tag):
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+
+def document_text(raw: bytes, source: str) -> str:
+    """
+    Plain text of a pdf, html, markdown or text document.
+    """
+    if raw[:5] == b"%PDF-":
+        if PdfReader is None:
+            raise ValueError(f"{source} is a pdf, install pypdf to read it")
+        reader = PdfReader(BytesIO(raw))
+        return "\n\n".join(page.extract_text() or ""
+                           for page in reader.pages)
+    text = raw.decode("utf-8", errors="replace")
+    if re.search(r"<(html|body|p|div)\b", text[:5000], re.IGNORECASE):
+        parser = _TextParser()
+        parser.feed(text)
+        text = "".join(parser.parts)
+    return text
+
+
+def _heading(line: str) -> str | None:
+    # markdown headings and short numbered titles such as "3. Tokenomics"
+    match = re.match(r"^#{1,6}\s+(.+)$", line)
+    if match:
+        return match.group(1).strip()
+    if len(line) <= 80 and re.match(r"^\d+(\.\d+)*\.?\s+[A-Z]", line) \
+            and not line.endswith((".", ",", ";")):
+        return line
+    return None
+
+
+def split_sections(text: str) -> list[dict]:
+    """
+    Sections of about CHUNK_CHARS characters, split at paragraphs, each
+    with the heading it belongs to.
+    """
+    chunks = []
+    heading, parts, length = "", [], 0
+
+    def flush():
+        nonlocal parts, length
+        if parts:
+            chunks.append({"heading": heading, "text": "\n".join(parts)})
+        parts, length = [], 0
+
+    paragraphs = re.split(r"\n\s*\n", text.replace("\r\n", "\n"))
+    for paragraph in paragraphs:
+        lines = [" ".join(line.split()) for line in paragraph.split("\n")]
+        lines = [line for line in lines if line]
+        if not lines:
+            continue
+        title = _heading(lines[0])
+        if title:
+            flush()
+            heading = title
+            lines = lines[1:]
+        paragraph = " ".join(lines)
+        if not paragraph:
+            continue
+        # long paragraphs are cut at sentence ends
+        while len(paragraph) > CHUNK_CHARS:
+            cut = paragraph.rfind(". ", 0, CHUNK_CHARS) + 1 \
+                or CHUNK_CHARS
+            flush()
+            parts, length = [paragraph[:cut].strip()], cut
+            paragraph = paragraph[cut:].strip()
+        if length + len(paragraph) > CHUNK_CHARS:
+            flush()
+        parts.append(paragraph)
+        length += len(paragraph)
+    flush()
+    return chunks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Whitepaper corpus")
+    parser.add_argument("--tokens", type=Path,
+                        default=Path("data/erc20_data/erc20_data.csv"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("import", help="import or fetch a whitepaper")
+    add.add_argument("token", help="CMC id or name in the token list")
+    add.add_argument("source", help="file or http(s) url")
+    add.add_argument("--refresh", action="store_true")
+    fetch = commands.add_parser("fetch", help="fetch the whitepapers of "
+                                              "the token list")
+    fetch.add_argument("--refresh", action="store_true")
+    show = commands.add_parser("show", help="print the sections of a "
+                                            "subject")
+    show.add_argument("token", help="CMC id or name in the token list")
+    show.add_argument("subject", choices=list(SUBJECT_QUERIES))
+    args = parser.parse_args()
+
+    store = DocumentStore()
+    if args.command == "import":
+        cmc_id = token_id(args.token, args.tokens)
+        if re.match(r"^https?://", args.source):
+            changed = store.fetch(cmc_id, args.source, args.refresh)
+        else:
+            changed = store.import_file(cmc_id, Path(args.source))
+        print(f"{args.token}: {store.sha(cmc_id)[:12]} "
+              f"{'updated' if changed else 'unchanged'}")
+    elif args.command == "fetch":
+        # the whitepaper links of the CoinMarketCap metadata
+        with args.tokens.open(encoding="utf-8", newline="") as f:
+            tokens = list(csv.DictReader(f))
+        if tokens and "whitepaper_url" not in tokens[0]:
+            raise ValueError(f"{args.tokens} has no whitepaper_url, "
+                             "run get_erc20.py again")
+        for row in tokens:
+            token, url = row["name"], row["whitepaper_url"]
+            if not url:
+                continue
+            cmc_id = int(row["id"])
+            try:
+                changed = store.fetch(cmc_id, url, args.refresh)
+            except (requests.RequestException, ValueError) as e:
+                print(f"{token}: {url} failed ({e})")
+                continue
+            print(f"{token}: {store.sha(cmc_id)[:12]} "
+                  f"{'updated' if changed else 'unchanged'}")
+    else:
+        print(store.sections(token_id(args.token, args.tokens),
+                             [args.subject]))
@@ -0,0 +1,150 @@
+import base64
+import gzip
+import hashlib
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from aggregate import TOKENOMICS_SUBJECTS, split_columns
+from sink import OutputSink, default_sink
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+"""
+Compact, sharded export of the final data set.
+
+core.json holds the token columns as arrays (one entry per token, same
+order everywhere) and the 0/1 category flags of every subject bit-packed
+per column. The long Information_* and Uncertainty_* texts go to one shard
+per subject that the UI only loads when a subject is opened. Every file is
+written with its content hash in the name, next to a .gz and (with the
+brotli package installed) a .br copy. manifest.json maps the shards to the
+current file names.
+
+Decoding a flag column: base64 decode, then bit i of the bytes (most
+significant bit first) is the flag of token i. Tokens without a result of
+the subject are set in the "missing" column of the subject.
+"""
+
+
+def pack_bits(mask: np.ndarray) -> str:
+    return base64.b64encode(np.packbits(mask).tobytes()).decode("ascii")
+
+
+def to_list(values: pd.Series) -> list:
+    # NaN becomes null
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def core_data(df: pd.DataFrame, subjects: list[str]) -> dict:
+    """
+    Token columns as arrays and the category flags bit-packed.
+    """
+    subject_cols = set()
+    flags = {}
+    for subject in subjects:
+        flag_cols, info, uncertainty = split_columns(subject)
+        subject_cols.update(flag_cols + [info, uncertainty])
+        matrix = df.reindex(columns=flag_cols).to_numpy(dtype=float)
+        flags[subject] = {
+            "columns": flag_cols,
+            "bits": [pack_bits(matrix[:, i] == 1)
+                     for i in range(len(flag_cols))],
+            "missing": pack_bits(np.isnan(matrix).all(axis=1))
+        }
+
+    columns = {col: to_list(df[col]) for col in df.columns
+               if col not in subject_cols}
+    return {"rows": len(df), "columns": columns, "flags": flags}
+
+
+def text_data(df: pd.DataFrame, subject: str) -> dict:
+    """
+    Information and uncertainty texts of one subject, by token position.
+    """
+    _, info, uncertainty = split_columns(subject)
+    texts = df.reindex(columns=[info, uncertainty])
+    return {"subject": subject,
+            "info": to_list(texts[info]),
+            "uncertainty": to_list(texts[uncertainty])}
+
+
+def write_shard(sink: OutputSink, destination: str, folder: str, stem: str,
+                data: dict) -> dict:
+    """
+    Write one shard as {folder}/{stem}.{hash}.json plus compressed copies
+    and return its manifest entry.
+    """
+    raw = json.dumps(data, ensure_ascii=False,
+                     separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    name = f"{stem}.{digest[:12]}.json"
+    entry = {"file": name, "sha256": digest, "bytes": len(raw)}
+
+    # mtime 0 keeps the gzip output stable for unchanged content
+    encoded = {"gzip": (".gz", gzip.compress(raw, 9, mtime=0))}
+    if brotli is not None:
+        encoded["brotli"] = (".br", brotli.compress(raw, quality=11))
+
+    sink.write(raw, **{destination: f"{folder}/{name}"})
+    for encoding, (suffix, payload) in encoded.items():
+        sink.write(payload, **{destination: f"{folder}/{name}{suffix}"})
+        entry[f"{encoding}_bytes"] = len(payload)
+    return entry
+
+
+def export_compact(df: pd.DataFrame,
+                   subjects: list[str] = TOKENOMICS_SUBJECTS,
+                   sink: OutputSink | None = None,
+                   destination: str = "frontend",
+                   folder: str = "compact") -> dict:
+    """
+    Write core and text shards and the manifest to the folder of the sink
+    destination, remove shards of earlier exports. Returns the manifest.
+    """
+    sink = sink or default_sink()
+    shards = {"core": write_shard(sink, destination, folder, "core",
+                                  core_data(df, subjects))}
+    for subject in subjects:
+        shards[f"text/{subject}"] = write_shard(
+            sink, destination, folder, f"text-{subject}",
+            text_data(df, subject))
+
+    manifest = {"rows": len(df), "shards": shards}
+    sink.write(json.dumps(manifest, indent=2),
+               **{destination: f"{folder}/manifest.json"})
+
+    directory = sink.directory(destination)
+    if directory is None:
+        return manifest
+    current = {entry["file"] for entry in shards.values()}
+    for path in (directory / folder).glob("*.json*"):
+        if path.name != "manifest.json" and \
+                path.name.split(".json")[0] + ".json" not in current:
+            path.unlink()
+    return manifest
+
+
+def first_load_bytes(manifest: dict) -> int:
+    """
+    Bytes the UI loads before a subject is opened: the manifest and the
+    compressed core shard.
+    """
+    core = manifest["shards"]["core"]
+    return (len(json.dumps(manifest, indent=2))
+            + core.get("brotli_bytes", core["gzip_bytes"]))
+
+
+if __name__ == "__main__":
+    data = pd.read_csv(Path("./data/result/erc20_full_data.csv"))
+    manifest = export_compact(
+        data, sink=OutputSink({"result": "data/result"}),
+        destination="result")
+    legacy = len(data.to_json(orient="records", force_ascii=False,
+                              indent=2).encode("utf-8"))
+    print(f"erc20_full_data.json {legacy} bytes, compact first load "
+          f"{first_load_bytes(manifest)} bytes "
+          f"({legacy / first_load_bytes(manifest):.0f}x smaller)")
@@ -0,0 +1,198 @@
+import json
+import re
+import threading
+from pydantic import BaseModel, ValidationError
+
+"""
+Local extraction of the JSON object in the agent output.
+
+The agents are asked for plain JSON, so most outputs only need the object
+cut out of code fences or surrounding prose and a few common mistakes
+repaired. extract_data only calls the LLM parser if this fails.
+"""
+
+FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def _balanced(text: str, start: int) -> str | None:
+    """
+    The {...} or [...] block opening at text[start], strings are skipped.
+    """
+    opening = text[start]
+    closing = "}" if opening == "{" else "]"
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == opening:
+            depth += 1
+        elif char == closing:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def find_json(text: str) -> list[str]:
+    """
+    Candidate JSON blocks of the text, fenced blocks first.
+    """
+    candidates = [block.strip() for block in FENCE.findall(text)]
+    for match in re.finditer(r"[{\[]", text):
+        block = _balanced(text, match.start())
+        if block and block.count(":"):
+            candidates.append(block)
+    return candidates
+
+
+LITERALS = {"None": "null", "True": "true", "False": "false"}
+LITERAL = re.compile(r"(?<![\w.])(None|True|False)\b")
+SMART_QUOTES = "\u201c\u201d"
+TRAILING_COMMA = re.compile(r",\s*[}\]]")
+
+
+def repair_json(candidate: str) -> str:
+    """
+    Fix the mistakes LLMs commonly make in JSON: smart quotes around
+    strings, trailing commas and python literals. Only the text outside of
+    strings is changed, string values are copied as they are.
+    """
+    repaired = []
+    closing = None  # quote that ends the current string
+    escaped = False
+    i = 0
+    while i < len(candidate):
+        char = candidate[i]
+        if closing:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == closing or (closing != '"' and char == '"'):
+                char, closing = '"', None
+            repaired.append(char)
+            i += 1
+            continue
+
+        if char == '"' or char in SMART_QUOTES:
+            # a smart quoted string ends at a smart or plain quote
+            closing = '"' if char == '"' else "\u201d"
+            repaired.append('"')
+        elif char == "," and TRAILING_COMMA.match(candidate, i):
+            # trailing comma, dropped
+            pass
+        elif (match := LITERAL.match(candidate, i)) is not None:
+            repaired.append(LITERALS[match.group(1)])
+            i = match.end()
+            continue
+        else:
+            repaired.append(char)
+        i += 1
+    return "".join(repaired)
+
+
+def loads(candidate: str):
+    """
+    Parse a candidate as it is, repaired only if it is not valid JSON.
+    """
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        return json.loads(repair_json(candidate))
+
+
+def _key(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def normalize(data, ModelClass: type[BaseModel], token: str) -> dict:
+    """
+    Bring a parsed object into the {"tokens": [...]} shape of the model.
+    Keys are matched ignoring case and separators, "Other" is mapped to
+    the Other_* field of the subject and the token name is set.
+    """
+    if isinstance(data, dict) and "tokens" in data:
+        records = data["tokens"]
+    elif isinstance(data, list):
+        records = data
+    else:
+        records = [data]
+    if not records or not all(isinstance(r, dict) for r in records):
+        raise ValueError("no token records found")
+
+    profile = ModelClass.model_fields["tokens"].annotation.__args__[0]
+    fields = profile.model_fields
+    by_key = {_key(name): name for name in fields}
+    other = next((name for name in fields if name.startswith("Other_")),
+                 None)
+    if other:
+        by_key.setdefault("other", other)
+
+    tokens = []
+    for record in records:
+        clean = {}
+        for name, value in record.items():
+            field = by_key.get(_key(name))
+            if field:
+                clean[field] = value
+        clean["Token"] = token
+
+        for name, info in fields.items():
+            if name.startswith("Uncertainty_"):
+                clean.setdefault(name, None)
+            elif info.annotation is int and clean.get(name) not in (0, 1):
+                raise ValueError(f"{name} is not a 0/1 flag")
+        tokens.append(clean)
+    return {"tokens": tokens}
+
+
+def extract_local(agent_output: str, ModelClass: type[BaseModel],
+                  token: str) -> BaseModel | None:
+    """
+    Validated model of the agent output, None if no candidate validates.
+    """
+    for candidate in find_json(agent_output):
+        try:
+            data = normalize(loads(candidate),
+                             ModelClass, token)
+            return ModelClass.model_validate_json(json.dumps(data))
+        except (ValueError, ValidationError):
+            continue
+    return None
+
+
+class ExtractionStats:
+    """
+    How often the local fast path succeeds, shared by worker threads.
+    """
+
+    def __init__(self):
+        self.local = 0
+        self.fallback = 0
+        self.lock = threading.Lock()
+
+    def record(self, local: bool):
+        with self.lock:
+            if local:
+                self.local += 1
+            else:
+                self.fallback += 1
+
+    def summary(self) -> str:
+        total = self.local + self.fallback
+        rate = self.local / total * 100 if total else 0.0
+        return (f"local extraction: {self.local}/{total} ({rate:.1f}%), "
+                f"{self.fallback} LLM fallbacks")
+
+
+extraction_stats = ExtractionStats()
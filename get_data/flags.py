@@ -0,0 +1,194 @@
+import argparse
+import re
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from aggregate import TOKENOMICS_SUBJECTS, split_columns
+
+"""
+Bit-packed category flags of all subjects with a boolean query API.
+
+Every category column of the merged data set becomes one row of 64-bit
+words, bit i of a row is the flag of token i. The flags arrive as 0/1,
+0.0/1.0 or empty after the merge; only 1 sets a bit. A second bitset per
+column marks the tokens with a result of that subject, so NOT only matches
+tokens whose result says 0 and not tokens without a result.
+
+python flags.py "DAO_Governance AND Smart_Contract_Audits AND NOT
+Fixed_Supply_Hard_Cap"
+"""
+
+SYNTAX = re.compile(r"\s*(\(|\)|[A-Za-z_][A-Za-z0-9_]*)")
+OPERATORS = {"AND", "OR", "NOT"}
+
+
+def pack_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Pack a (columns, tokens) bool matrix into (columns, words) uint64,
+    token i is bit i % 64 of word i // 64.
+    """
+    columns, n = matrix.shape
+    padded = np.zeros((columns, -(-n // 64) * 64), dtype=bool)
+    padded[:, :n] = matrix
+    return np.packbits(padded, axis=1, bitorder="little").view("<u8")
+
+
+def flag_matrix(df: pd.DataFrame,
+                subjects: list[str] = TOKENOMICS_SUBJECTS) -> tuple:
+    """
+    (columns, subject of each column, flags, known) of the merged data
+    set, flags and known as (tokens, columns) bool matrices. known is
+    False where the token has no result of the subject.
+    """
+    columns, column_subjects = [], []
+    for subject in subjects:
+        flag_cols = split_columns(subject)[0]
+        columns += flag_cols
+        column_subjects += [subject] * len(flag_cols)
+    values = df.reindex(columns=columns).to_numpy(dtype=float)
+    return columns, column_subjects, values == 1, ~np.isnan(values)
+
+
+def parse(expression: str):
+    """
+    Parse AND, OR, NOT and parentheses into nested tuples, NOT binds
+    strongest and AND before OR:
+    ("or", ("and", "A", ("not", "B")), "C")
+    """
+    tokens, position = [], 0
+    while position < len(expression.rstrip()):
+        match = SYNTAX.match(expression, position)
+        if match is None:
+            raise ValueError(f"Unexpected {expression[position:]!r} in "
+                             f"query {expression!r}")
+        tokens.append(match.group(1))
+        position = match.end()
+
+    def peek():
+        return tokens[0] if tokens else None
+
+    def either():
+        node = both()
+        while peek() == "OR":
+            tokens.pop(0)
+            node = ("or", node, both())
+        return node
+
+    def both():
+        node = factor()
+        while peek() == "AND":
+            tokens.pop(0)
+            node = ("and", node, factor())
+        return node
+
+    def factor():
+        if not tokens:
+            raise ValueError(f"Incomplete query {expression!r}")
+        token = tokens.pop(0)
+        if token == "NOT":
+            return ("not", factor())
+        if token == "(":
+            node = either()
+            if peek() != ")":
+                raise ValueError(f"Missing ) in query {expression!r}")
+            tokens.pop(0)
+            return node
+        if token == ")" or token in OPERATORS:
+            raise ValueError(f"Unexpected {token} in query {expression!r}")
+        return token
+
+    node = either()
+    if tokens:
+        raise ValueError(f"Unexpected {tokens[0]} in query {expression!r}")
+    return node
+
+
+class FlagMatrix:
+    """
+    Category flags of all tokens as bitsets. query() returns the CMC ids
+    of the matching tokens in the order of the data set, count() only the
+    number. Columns are the names of the merged data set, e.g.
+    Inflationary_Supply_Price_and_Market.
+    """
+
+    def __init__(self, ids: np.ndarray, columns: list[str],
+                 flags: np.ndarray, known: np.ndarray):
+        self.ids = np.asarray(ids)
+        self.columns = list(columns)
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self.bits = pack_rows(flags)
+        self.known = pack_rows(known)
+        # compiled queries of this matrix
+        self.compile = lru_cache(maxsize=256)(self._compile)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame,
+                   subjects: list[str] = TOKENOMICS_SUBJECTS
+                   ) -> "FlagMatrix":
+        """
+        Flags of the subjects from the merged data set, columns of
+        subjects without results count as unknown.
+        """
+        columns, _, flags, known = flag_matrix(df, subjects)
+        return cls(df["id"].to_numpy(), columns, flags.T, known.T)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def column(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        if name not in self.index:
+            raise ValueError(f"Unknown category {name}")
+        i = self.index[name]
+        return self.bits[i], self.known[i]
+
+    def _compile(self, expression: str):
+        """
+        Evaluate the parsed query to (matching, known) words. An AND or OR
+        is known where both sides are, NOT matches the known tokens
+        without the flag.
+        """
+        def evaluate(node):
+            if isinstance(node, str):
+                return self.column(node)
+            if node[0] == "not":
+                value, known = evaluate(node[1])
+                return known & ~value, known
+            left, left_known = evaluate(node[1])
+            right, right_known = evaluate(node[2])
+            value = left & right if node[0] == "and" else left | right
+            return value, left_known & right_known
+
+        tree = parse(expression)
+        # unknown names fail here and not on the first query
+        evaluate(tree)
+        return lambda: evaluate(tree)[0]
+
+    def mask(self, expression: str) -> np.ndarray:
+        """
+        Matching tokens as packed words.
+        """
+        return self.compile(expression)()
+
+    def query(self, expression: str) -> np.ndarray:
+        words = self.mask(expression)
+        matches = np.unpackbits(words.view(np.uint8), count=len(self.ids),
+                                bitorder="little")
+        return self.ids[matches.view(bool)]
+
+    def count(self, expression: str) -> int:
+        return int(np.bitwise_count(self.mask(expression)).sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the category flags")
+    parser.add_argument("expression", nargs="+")
+    parser.add_argument("--data", type=Path,
+                        default=Path("data/result/erc20_full_data.csv"))
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.data)
+    ids = FlagMatrix.from_frame(data).query(" ".join(args.expression))
+    matches = data.set_index("id").loc[ids, ["name", "market_cap"]]
+    print(matches.to_string())
+    print(f"{len(ids)} of {len(data)} tokens")
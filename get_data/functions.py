@@ -1,41 +1,11 @@
-from agents import Agent, Runner, WebSearchTool
-from pathlib import Path
-import pandas as pd
-from openai import OpenAI
+from agents import (Agent, ModelBehaviorError, ModelSettings, Runner,
+                    WebSearchTool)
 from pydantic import BaseModel
-from typing import List, Optional
-import os
-from dotenv import load_dotenv
-import requests
-
-"""
-Get Top 50 ERC-20 Tokens from CoinMarketCap.
-"""
-
-
-def get_erc20(api_key: str, limit: int = 50) -> pd.DataFrame:
-    url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest"
-    params = {"start": 1, "limit": 500, "convert": "USD"}
-    headers = {"X-CMC_PRO_API_KEY": api_key, "Accepts": "application/json"}
-
-    data = requests.get(url, params=params, headers=headers).json()["data"]
-    erc20 = [
-        {
-            "id": c["id"],
-            "symbol": c["symbol"],
-            "name": c["name"],
-            "price": c["quote"]["USD"]["price"],
-            "market_cap": c["quote"]["USD"]["market_cap"],
-            "circulating_supply": c["circulating_supply"],
-            "total_supply": c["total_supply"],
-            "max_supply": c["max_supply"],
-            "contract": c["platform"]["token_address"]
-        }
-        for c in data
-        if c.get("platform") and c["platform"]["slug"] == "ethereum"
-    ]
-    return pd.DataFrame(erc20[:limit])
-
+from cache import cache_key
+from session import default_session
+from extraction import extract_local, extraction_stats
+from telemetry import track
+from models import SUBJECT_FIELDS, TokenomicsModel, pydantic_class
 
 """
 Get information about the tokenomics subjects class, governance, distribution,
@@ -44,56 +14,160 @@ with OpenAI Agents SDK.
 """
 
 
-async def research_agent(tokenomics_subject="emissiontype", token_loc=1):
-    """
-    Main research function to run an agent on a tokenomics topic for a subset
-    of ERC20 tokens.
-    """
-    # load key
-    load_dotenv(override=True)
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key is None:
-        raise ValueError("API Key not found")
-
-    instruction_txt = f"{tokenomics_subject}_instruction.txt"
-
-    # Load instruction text
-    file_path = Path("instructions") / instruction_txt
-    with file_path.open("r", encoding="utf-8") as f:
-        instruction = f.read()
-
-    # Load ERC20 token list
-    start = token_loc - 1
-    erc20_data = pd.read_csv(Path("data/erc20_data") / "erc20_data.csv")
-    token = erc20_data['name'].iloc[start]
-
-    # Build prompt
-    prompt = f"""Please read the following instuctions carefully and analyze
-                 the token {token}.
+# system prompt of research_agent, the same bytes for every token of a
+# subject, so the API can reuse the cached prefix
+RESEARCH_INSTRUCTIONS = """Please read the following instructions carefully and
+                 analyze the token named at the end.
                  The Instructions: {instruction}
                  Do not add any explanation, heading, links, or markdown only
                  valid JSON!
+                 """
+
+# per-token input of research_agent, always last
+RESEARCH_PROMPT = """Analyze the token {token}.
                  The Column "Token" must match exactly the Tokenname: {token}!
                  """
 
-    # Initialize agent
-    agent = Agent(
-        name="Tokenomics Agent",
-        instructions=prompt,
-        tools=[WebSearchTool()],
-        model="gpt-4o"
-    )
+# per-token input with the whitepaper sections of the local corpus
+CORPUS_PROMPT = """Analyze the token {token} with the following sections of
+                 its whitepaper, do not use other sources.
+                 {sections}
+                 The Column "Token" must match exactly the Tokenname: {token}!
+                 """
 
-    # Run agent
-    result = await Runner.run(agent, prompt)
 
-    # Extract final output
-    final_output = result.final_output
+# project links of CoinMarketCap, appended to the per-token input
+SOURCES_PROMPT = """Start with the official sources of the project:
+                 {sources}
+                 """
+
+SOURCE_LABELS = {
+    "whitepaper_url": "Whitepaper",
+    "website_url": "Website",
+    "docs_url": "Documentation"
+}
+
+
+def research_prompt(token: str, sections: str | None,
+                    urls: dict | None = None) -> str:
+    """
+    Per-token input, with the whitepaper sections if there are any,
+    otherwise with the project links so the agent does not have to search
+    for them.
+    """
+    if sections:
+        return CORPUS_PROMPT.format(token=token, sections=sections)
+    prompt = RESEARCH_PROMPT.format(token=token)
+    if urls:
+        sources = "\n                 ".join(
+            f"{SOURCE_LABELS[col]}: {url}" for col, url in urls.items())
+        prompt += SOURCES_PROMPT.format(sources=sources)
+    return prompt
+
+
+def prompt_cache_settings(stage: str, subject: str) -> ModelSettings:
+    """
+    Route the calls of a stage and subject to the same prompt cache.
+    """
+    return ModelSettings(
+        extra_body={"prompt_cache_key": f"tokenomics-{stage}-{subject}"})
+
+
+async def research_agent(tokenomics_subject="emissiontype", token_loc=1,
+                         cache=None, limiter=None, session=None,
+                         telemetry=None, router=None, corpus=None):
+    """
+    Main research function to run an agent on a tokenomics topic for a subset
+    of ERC20 tokens. With a ResponseCache an unchanged request returns the
+    cached answer, a RateLimiter is only acquired for real calls. Real calls
+    are recorded by the Telemetry. A ModelRouter starts with a cheap model
+    and escalates if its answer does not validate or is uncertain. If the
+    DocumentStore has the whitepaper of the token, the agent gets its
+    relevant sections instead of the web search tool, otherwise the links
+    of the token list to start the search from.
+    """
+    # keys, token list and clients are loaded once per session
+    session = session or default_session()
+
+    # Load instruction text
+    instruction = session.instruction(tokenomics_subject)
 
-    # Save result to /data/text_output
-    output_path = Path("data/text_output") / \
-        f"{tokenomics_subject}_{token}_result.txt"
-    output_path.write_text(final_output, encoding="utf-8")
+    # Load ERC20 token list
+    token = session.token(token_loc)
+
+    # the agent output is stored by the CMC id of the token
+    cmc_id = session.cmc_id(token_loc)
+
+    # whitepaper sections of the local corpus, if any
+    sections = corpus.sections(cmc_id, [tokenomics_subject]) if corpus \
+        else None
+
+    # return the cached answer if nothing relevant changed
+    models = (router.models("research", tokenomics_subject) if router
+              else ["gpt-4o"])
+    key = cache_key(stage="research", model=" > ".join(models),
+                    subject=tokenomics_subject, instruction=instruction,
+                    template=RESEARCH_INSTRUCTIONS + RESEARCH_PROMPT
+                    + CORPUS_PROMPT + SOURCES_PROMPT,
+                    sections=sections,
+                    token=session.token_identity(token_loc))
+    final_output = cache.get(key) if cache else None
+    if final_output is not None:
+        session.artifacts.put("research", cmc_id, tokenomics_subject, token,
+                              final_output)
+        return final_output
+
+    # Build prompt, the static instructions first and the token last
+    instructions = RESEARCH_INSTRUCTIONS.format(instruction=instruction)
+    prompt = research_prompt(token, sections,
+                             session.token_urls(token_loc))
+
+    for attempt, model in enumerate(models):
+        # Initialize agent
+        agent = Agent(
+            name="Tokenomics Agent",
+            instructions=instructions,
+            tools=[] if sections else [WebSearchTool()],
+            model=model,
+            model_settings=prompt_cache_settings("research",
+                                                 tokenomics_subject)
+        )
+
+        # Run agent
+        with track(telemetry, stage="research", subject=tokenomics_subject,
+                   token=token, model=model, attempt=attempt) as call:
+            if limiter:
+                taken = await limiter.acquire()
+            call.start()
+            result = await Runner.run(agent, prompt,
+                                      run_config=session.run_config)
+            call.add_usage(result.context_wrapper.usage)
+            call.add_web_searches(result.raw_responses)
+            # the web searches make the real usage a multiple of the guess
+            if limiter and call.tokens():
+                limiter.settle(taken, call.tokens())
+
+        # Extract final output
+        final_output = result.final_output
+        if not router:
+            break
+
+        # escalate to the next model if the answer is not good enough
+        reason = None
+        if attempt < len(models) - 1:
+            parsed = extract_local(final_output,
+                                   pydantic_class(tokenomics_subject), token)
+            reason = router.reason("research", parsed)
+        router.record("research", tokenomics_subject, model, attempt,
+                      reason)
+        if reason is None:
+            break
+
+    # Save result to the artifact store
+    session.artifacts.put("research", cmc_id, tokenomics_subject, token,
+                          final_output)
+    if cache:
+        cache.set(key, final_output)
 
     return final_output
 
@@ -102,249 +176,261 @@ Extract the json file from the textfile of the agent.
 """
 
 
-def extract_data(tokenomics_subject="emissiontype", token_loc=1):
-    # load key
-    load_dotenv(override=True)
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key is None:
-        raise ValueError("API Key not found")
-
-    client = OpenAI(api_key=api_key)
-
-    # System-Prompt
-    prompt = """You are given the output of an AI agent that contains
+# System-Prompt of extract_data
+EXTRACT_PROMPT = """You are given the output of an AI agent that contains
 unstructured text with a table or JSON-like section. Your task is to
 extract that table or JSON object, validate its structure, and return
 a clean JSON object.
 
 Return only the validated JSON object. Strictly no markdown or extra text.
 """
+
+
+def extract_data(tokenomics_subject="emissiontype", token_loc=1,
+                 cache=None, limiter=None, session=None, telemetry=None,
+                 router=None):
+    # keys, token list and clients are loaded once per session
+    session = session or default_session()
+
     # Load ERC20 token list
-    start = token_loc - 1
-    erc20_data = pd.read_csv(Path("data/erc20_data") / "erc20_data.csv")
-    token = erc20_data['name'].iloc[start]
+    token = session.token(token_loc)
 
-    # read Agent-Output file
-    output_path = Path("data/text_output") / \
-        f"{tokenomics_subject}_{token}_result.txt"
-    agent_output = output_path.read_text(encoding="utf-8")
+    # read Agent-Output of the research stage
+    agent_output = session.artifacts.get("research",
+                                         session.cmc_id(token_loc),
+                                         tokenomics_subject)
+    if agent_output is None:
+        raise ValueError(f"No research output for {tokenomics_subject} "
+                         f"{token}")
 
     # load corresponding pydantic_class
     ModelClass = pydantic_class(tokenomics_subject)
 
-    # OpenAI-Parsing
-    response = client.responses.parse(
-        model="gpt-4o",
-        input=[
-            {"role": "system",
-             "content": prompt},
-            {"role": "user",
-             "content": f"Here is the text from the AI agent:\n{agent_output}"}
-        ],
-        text_format=ModelClass,
-    )
-
-    parsed_output = response.output_parsed
-
-    # save as json
-    json_output_path = (
-        Path("data/json_output") /
-        f"{tokenomics_subject}_{token}_result.json"
-    )
-    json_output_path.parent.mkdir(parents=True, exist_ok=True)
-    json_output_path.write_text(parsed_output.model_dump_json(indent=2),
-                                encoding="utf-8")
+    # fast path: cut the JSON out of the agent output and validate it
+    parsed_output = extract_local(agent_output, ModelClass, token)
+    extraction_stats.record(parsed_output is not None)
+    if parsed_output is not None:
+        save_result(tokenomics_subject, token_loc, parsed_output,
+                    session)
+        return parsed_output
+
+    # return the cached answer if the agent output did not change
+    models = (router.models("extract", tokenomics_subject) if router
+              else ["gpt-4o"])
+    key = extract_key(tokenomics_subject, token_loc, agent_output, models,
+                      session)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        parsed_output = ModelClass.model_validate_json(cached)
+        save_result(tokenomics_subject, token_loc, parsed_output,
+                    session)
+        return parsed_output
+
+    # OpenAI-Parsing, the next model only if the answer does not validate
+    for attempt, model in enumerate(models):
+        last = attempt == len(models) - 1
+        with track(telemetry, stage="extract", subject=tokenomics_subject,
+                   token=token, model=model, attempt=attempt) as call:
+            if limiter:
+                taken = limiter.acquire_sync()
+            call.start()
+            try:
+                response = session.openai.responses.parse(
+                    model=model,
+                    input=extract_input(agent_output),
+                    text_format=ModelClass,
+                    extra_body={"prompt_cache_key":
+                                f"tokenomics-extract-{tokenomics_subject}"}
+                )
+                call.add_usage(response.usage)
+                if limiter and call.tokens():
+                    limiter.settle(taken, call.tokens())
+                parsed_output = response.output_parsed
+                if parsed_output is None:
+                    # a refusal or an empty answer
+                    raise ValueError(f"{model} returned no "
+                                     f"{tokenomics_subject} result for "
+                                     f"{token}")
+            except ValueError:
+                # pydantic rejected the answer or there is none
+                if last or not router:
+                    raise
+                parsed_output = None
+
+        if not router:
+            break
+        reason = None if last else router.reason("extract", parsed_output)
+        router.record("extract", tokenomics_subject, model, attempt, reason)
+        if reason is None:
+            break
+
+    # save as extract artifact
+    save_result(tokenomics_subject, token_loc, parsed_output, session)
+    if cache:
+        cache.set(key, parsed_output.model_dump_json())
 
     return parsed_output
 
 
+def extract_input(agent_output: str) -> list[dict]:
+    """
+    Input messages of the parsing call, also used by the batch requests.
+    """
+    return [
+        {"role": "system",
+         "content": EXTRACT_PROMPT},
+        {"role": "user",
+         "content": "Here is the text from the AI agent:\n"
+                    f"{agent_output}"}
+    ]
+
+
+def extract_key(tokenomics_subject: str, token_loc: int, agent_output: str,
+                models: list[str], session) -> str:
+    """
+    Cache key of a parsing call, the same for extract_data and a batch.
+    """
+    return cache_key(stage="extract", model=" > ".join(models),
+                     subject=tokenomics_subject, template=EXTRACT_PROMPT,
+                     schema=pydantic_class(tokenomics_subject)
+                     .model_json_schema(),
+                     agent_output=agent_output,
+                     token=session.token_identity(token_loc))
+
+
+def save_result(tokenomics_subject: str, token_loc: int,
+                parsed_output: BaseModel, session) -> None:
+    """
+    Store the validated subject model as the extract artifact of the
+    token, the input of the merge in main.py.
+    """
+    session.artifacts.put("extract", session.cmc_id(token_loc),
+                          tokenomics_subject, session.token(token_loc),
+                          parsed_output.model_dump_json(indent=2))
+
+
 """
-pydantic classes
+Research all tokenomics subjects of one token in a single agent run.
 """
 
 
-# Emissiontype
-class TokenEmissionProfile(BaseModel):
-    Token: str
-    Fixed_Supply_Hard_Cap: int
-    Halvening_Exponential_Decay: int
-    Linear_Emission: int
-    Staged_Vesting_Supply: int
-    Inflationary_Supply: int
-    Bonding_Curve_Issuance: int
-    Rebase_Elastic_Supply: int
-    Mint_Burn_On_Demand: int
-    Dynamic_Staking_Supply: int
-    DAO_Governance_Controlled: int
-    Continuous_Auction_Streaming: int
-    Other_Emission: int
-    Information_Emission: str
-    Uncertainty_Emission: Optional[str]
-
-
-class EmissiontypeModel(BaseModel):
-    tokens: List[TokenEmissionProfile]
-
-
-# Governance Mechanism
-class TokenGovernanceProfile(BaseModel):
-    Token: str
-    On_Chain_Governance: int
-    Off_Chain_Governance: int
-    DAO_Governance: int
-    Delegated_Voting: int
-    Quadratic_Voting: int
-    Multi_Signature_Control: int
-    Council_Based_Governance: int
-    Proposal_Voting_Systems: int
-    Time_Locked_Governance: int
-    Community_Treasury_Voting: int
-    Other_Governance: int
-    Information_Governance: str
-    Uncertainty_Governance: Optional[str]
-
-
-class GovernanceModel(BaseModel):
-    tokens: List[TokenGovernanceProfile]
-
-
-# Class
-class TokenClassProfile(BaseModel):
-    Token: str
-    Payment_Token: int
-    Utility_Token: int
-    Investment_Token: int
-    Other_Class: int
-    Information_Class: str
-    Uncertainty_Class: Optional[str]
-
-
-class TokenClassModel(BaseModel):
-    tokens: List[TokenClassProfile]
-
-
-# Distribution
-class TokenDistributionProfile(BaseModel):
-    Token: str
-    Airdrops: int
-    Initial_Coin_Offering: int
-    Initial_Exchange_Offering: int
-    Security_Token_Offering: int
-    Initial_DEX_Offering: int
-    Liquidity_Bootstrapping_Pool: int
-    Fair_Launch: int
-    Direct_Sale: int
-    Community_Incentives: int
-    Bounty_Programs: int
-    Other_Distribution: int
-    Information_Distribution: str
-    Uncertainty_Distribution: Optional[str]
-
-
-class DistributionModel(BaseModel):
-    tokens: List[TokenDistributionProfile]
-
-
-# Incentive
-class TokenIncentiveProfile(BaseModel):
-    Token: str
-    Staking_Rewards: int
-    Liquidity_Mining: int
-    Governance_Token_Systems: int
-    Yield_Farming: int
-    Token_Based_User_Rewards: int
-    Other_Incentive: int
-    Information_Incentive: str
-    Uncertainty_Incentive: Optional[str]
-
-
-class IncentiveModel(BaseModel):
-    tokens: List[TokenIncentiveProfile]
-
-
-# Price and Market
-class TokenMarketMechanismProfile(BaseModel):
-    Token: str
-    Fixed_Supply: int
-    Inflationary_Supply: int
-    Deflationary_Mechanisms: int
-    Halving_or_Exponential_Decay: int
-    Dynamic_Minting_and_Burning: int
-    Bonding_Curves: int
-    Continuous_Auctions_and_Streaming: int
-    Vesting_and_Staged_Releases: int
-    AMM_Pricing: int
-    DAO_Governance_Controlled_Pricing: int
-    Other_Price_and_Market: int
-    Information_Price_and_Market: str
-    Uncertainty_Price_and_Market: Optional[str]
-
-
-class MarketMechanismModel(BaseModel):
-    tokens: List[TokenMarketMechanismProfile]
-
-
-# Risk and Security
-class TokenRiskSecurityProfile(BaseModel):
-    Token: str
-    Smart_Contract_Audits: int
-    Bug_Bounty_Programs: int
-    Multi_Signature_Wallets: int
-    Insurance_Funds: int
-    Decentralized_Governance: int
-    Rate_Limiting_and_Circuit_Breakers: int
-    Token_Vesting_and_Lockups: int
-    Oracle_Security: int
-    Slashing_Mechanisms: int
-    KYC_AML_Compliance: int
-    Other_Risk_and_Security: int
-    Information_Risk_and_Security: str
-    Uncertainty_Risk_and_Security: Optional[str]
-
-
-class RiskSecurityModel(BaseModel):
-    tokens: List[TokenRiskSecurityProfile]
-
-
-# Vesting and Cliff
-class TokenVestingCliffProfile(BaseModel):
-    Token: str
-    Cliff_Period: int
-    Linear_Vesting: int
-    Graded_Vesting: int
-    Milestone_Based_Vesting: int
-    Hybrid_Vesting: int
-    Revocable_Vesting: int
-    Non_Revocable_Vesting: int
-    Team_Founder_Vesting: int
-    Investor_Vesting: int
-    Community_Incentive_Vesting: int
-    Other_Vesting_and_Cliff: int
-    Information_Vesting_and_Cliff: str
-    Uncertainty_Vesting_and_Cliff: Optional[str]
-
-
-class VestingCliffModel(BaseModel):
-    tokens: List[TokenVestingCliffProfile]
-
-
-def pydantic_class(subject: str) -> type[BaseModel]:
+# system prompt of research_agent_batch, the same for every token
+BATCH_INSTRUCTIONS = """Please read the following instructions carefully and
+                 analyze the token named at the end for each of the subjects
+                 {subject_list}.
+                 Research the official whitepaper and documentation once and
+                 use it for all subjects.
+                 The Instructions: {instruction}
+                 Fill the section of every subject with exactly one entry.
+                 """
+
+# per-token input of research_agent_batch, always last
+BATCH_PROMPT = RESEARCH_PROMPT
+
+
+async def research_agent_batch(token_loc=1, tokenomics_subjects=None,
+                               cache=None, limiter=None, session=None,
+                               telemetry=None, router=None, corpus=None):
     """
-    This function selects the correct data structure for each Tokenomic topic.
+    Batched variant of research_agent. One agent run researches every
+    subject of the token, so the web searches and the whitepaper are
+    shared. The structured output is split into the usual extract
+    artifacts of the subjects, no extract_data step is needed.
     """
-    if subject == "emissiontype":
-        return EmissiontypeModel
-    elif subject == "governance":
-        return GovernanceModel
-    elif subject == "class":
-        return TokenClassModel
-    elif subject == "distribution":
-        return DistributionModel
-    elif subject == "incentive":
-        return IncentiveModel
-    elif subject == "price_and_market":
-        return MarketMechanismModel
-    elif subject == "risk_and_security":
-        return RiskSecurityModel
-    elif subject == "vesting_and_cliff":
-        return VestingCliffModel
+    # keys, token list and clients are loaded once per session
+    session = session or default_session()
+
+    tokenomics_subjects = tokenomics_subjects or list(SUBJECT_FIELDS)
+
+    # Load instruction texts
+    instructions = [
+        f"### Subject: {subject}\n{session.instruction(subject)}"
+        for subject in tokenomics_subjects
+    ]
+
+    # Load ERC20 token list
+    token = session.token(token_loc)
+
+    # whitepaper sections of all subjects, if the corpus has the token
+    sections = corpus.sections(session.cmc_id(token_loc),
+                               tokenomics_subjects, top=3,
+                               max_chars=16000) if corpus else None
+
+    # return the cached answer if nothing relevant changed
+    models = (router.models("research_batch", "all") if router
+              else ["gpt-4o"])
+    subject_list = ", ".join(tokenomics_subjects)
+    instruction = "\n\n".join(instructions)
+    key = cache_key(stage="research_batch", model=" > ".join(models),
+                    subjects=tokenomics_subjects, instruction=instruction,
+                    template=BATCH_INSTRUCTIONS + BATCH_PROMPT
+                    + CORPUS_PROMPT + SOURCES_PROMPT,
+                    sections=sections,
+                    token=session.token_identity(token_loc))
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        final_output = TokenomicsModel.model_validate_json(cached)
+    else:
+        # Build prompt, the static instructions first and the token last
+        instructions = BATCH_INSTRUCTIONS.format(subject_list=subject_list,
+                                                 instruction=instruction)
+        prompt = research_prompt(token, sections,
+                                 session.token_urls(token_loc))
+
+        for attempt, model in enumerate(models):
+            last = attempt == len(models) - 1
+            # Initialize agent
+            agent = Agent(
+                name="Tokenomics Agent",
+                instructions=instructions,
+                tools=[] if sections else [WebSearchTool()],
+                model=model,
+                model_settings=prompt_cache_settings("research_batch",
+                                                     "all"),
+                output_type=TokenomicsModel
+            )
+
+            # Run agent, it answers all subjects at once
+            with track(telemetry, stage="research_batch", subject="all",
+                       token=token, model=model, attempt=attempt) as call:
+                if limiter:
+                    taken = await limiter.acquire(
+                        tokens=limiter.tokens_per_request
+                        * len(tokenomics_subjects))
+                call.start()
+                try:
+                    result = await Runner.run(agent, prompt,
+                                              run_config=session.run_config)
+                    call.add_usage(result.context_wrapper.usage)
+                    call.add_web_searches(result.raw_responses)
+                    if limiter and call.tokens():
+                        limiter.settle(taken, call.tokens())
+                    final_output = result.final_output
+                except ModelBehaviorError:
+                    # the structured output did not validate
+                    if last or not router:
+                        raise
+                    final_output = None
+
+            if not router:
+                break
+            reason = None if last else router.reason("research_batch",
+                                                     final_output)
+            router.record("research_batch", "all", model, attempt, reason)
+            if reason is None:
+                break
+        if cache:
+            cache.set(key, final_output.model_dump_json(by_alias=True))
+
+    # Save the combined result to the artifact store
+    session.artifacts.put("research_batch", session.cmc_id(token_loc), "all",
+                          token, final_output.model_dump_json(indent=2,
+                                                              by_alias=True))
+
+    # Split into one json per subject for the merge in main.py
+    for subject in tokenomics_subjects:
+        subject_output = getattr(final_output, SUBJECT_FIELDS[subject])
+        if subject_output is not None:
+            save_result(subject, token_loc, subject_output, session)
+
+    return final_output
@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+"""
+Append-only history of the numeric columns of every pipeline run.
+
+Each snapshot is appended as a segment directory with one .npy file per
+column (id, timestamp and the numeric columns), rows sorted by id and
+timestamp. Reads memory-map the segments, skip the ones outside the
+requested time range, find the rows of the requested ids by binary search
+and only touch the requested columns, so a range query does not load the
+whole history.
+
+Segments are compacted in tiers: when `fanout` neighbouring segments of the
+same level exist, they are merged into one segment of the next level. Only
+recent segments of similar size are rewritten, a row is merged about
+log(n) / log(fanout) times, and each segment still covers one contiguous
+time range.
+"""
+
+HISTORY_COLUMNS = [
+    "price",
+    "market_cap",
+    "circulating_supply",
+    "total_supply",
+    "max_supply"
+]
+
+
+class SnapshotStore:
+    """
+    Columnar snapshot store under data/history. manifest.json lists the
+    segments in time order with their time range, row count and level.
+    """
+
+    def __init__(self, directory: Path = Path("data/history"),
+                 columns: list[str] = HISTORY_COLUMNS, fanout: int = 8):
+        self.directory = Path(directory)
+        self.columns = columns
+        self.fanout = fanout
+        self.manifest_path = self.directory / "manifest.json"
+
+    def _manifest(self) -> list[dict]:
+        if not self.manifest_path.exists():
+            return []
+        return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+
+    def _save_manifest(self, segments: list[dict]):
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(segments, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    def _write_segment(self, name: str, arrays: dict) -> dict:
+        path = self.directory / name
+        path.mkdir(parents=True, exist_ok=True)
+        for column, array in arrays.items():
+            np.save(path / f"{column}.npy", array)
+        ts = arrays["timestamp"]
+        return {"name": name, "rows": int(len(ts)),
+                "start": int(ts.min()), "end": int(ts.max())}
+
+    def append(self, df: pd.DataFrame, timestamp: int | None = None) -> dict:
+        """
+        Add the numeric columns of one run, keyed by CMC id and timestamp
+        (unix seconds, now by default).
+        """
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        ids = df["id"].to_numpy(dtype=np.int64)
+        order = np.argsort(ids, kind="stable")
+        arrays = {
+            "id": ids[order],
+            "timestamp": np.full(len(df), timestamp, dtype=np.int64)
+        }
+        for column in self.columns:
+            arrays[column] = pd.to_numeric(df[column], errors="coerce") \
+                .to_numpy(dtype=np.float64)[order]
+
+        segments = self._manifest()
+        seq = 1 + max((s.get("seq", -1) for s in segments), default=-1)
+        segment = self._write_segment(f"seg-{timestamp}-{seq}", arrays)
+        segment.update(seq=seq, level=0)
+        segments.append(segment)
+        self._save_manifest(segments)
+
+        self.compact()
+        return segment
+
+    def _rows(self, segment: dict, seg_ids, seg_ts, ids, start, end):
+        """
+        Row numbers of a segment matching ids and time range, sliced by
+        binary search per id.
+        """
+        inside = ((start is None or segment["start"] >= start)
+                  and (end is None or segment["end"] <= end))
+        if ids is None:
+            if inside:
+                return np.arange(len(seg_ids))
+            mask = np.ones(len(seg_ts), dtype=bool)
+            if start is not None:
+                mask &= seg_ts >= start
+            if end is not None:
+                mask &= seg_ts <= end
+            return np.flatnonzero(mask)
+
+        lows = np.searchsorted(seg_ids, ids, side="left")
+        highs = np.searchsorted(seg_ids, ids, side="right")
+        ranges = []
+        for low, high in zip(lows, highs):
+            if low == high:
+                continue
+            if not inside:
+                # timestamps are sorted within the rows of an id
+                ts = seg_ts[low:high]
+                if start is not None:
+                    low += np.searchsorted(ts, start, side="left")
+                if end is not None:
+                    high = low + np.searchsorted(seg_ts[low:high], end,
+                                                 side="right")
+            if low < high:
+                ranges.append(np.arange(low, high))
+        return np.concatenate(ranges) if ranges else np.empty(0, np.int64)
+
+    def read(self, ids=None, start: int | None = None,
+             end: int | None = None, columns: list[str] | None = None
+             ) -> pd.DataFrame:
+        """
+        Rows of the given ids between start and end (unix seconds,
+        inclusive). Only the matching segments and columns are mapped.
+        """
+        columns = columns or self.columns
+        ids = None if ids is None else \
+            np.unique(np.asarray(list(ids), dtype=np.int64))
+        parts = []
+        for segment in self._manifest():
+            if start is not None and segment["end"] < start:
+                continue
+            if end is not None and segment["start"] > end:
+                continue
+            path = self.directory / segment["name"]
+            seg_ids = np.load(path / "id.npy", mmap_mode="r")
+            seg_ts = np.load(path / "timestamp.npy", mmap_mode="r")
+
+            rows = self._rows(segment, seg_ids, seg_ts, ids, start, end)
+            if rows.size == 0:
+                continue
+
+            part = {"id": seg_ids[rows], "timestamp": seg_ts[rows]}
+            for column in columns:
+                part[column] = np.load(path / f"{column}.npy",
+                                       mmap_mode="r")[rows]
+            parts.append(pd.DataFrame(part))
+
+        if not parts:
+            return pd.DataFrame(columns=["id", "timestamp"] + columns)
+        return pd.concat(parts, ignore_index=True) \
+            .sort_values(["id", "timestamp"], ignore_index=True)
+
+    def compact(self):
+        """
+        Merge the last `fanout` segments into one of the next level as
+        long as they have the same level, like the carry of a counter.
+        """
+        segments = self._manifest()
+        while len(segments) >= self.fanout:
+            tail = segments[-self.fanout:]
+            level = tail[-1].get("level", 0)
+            if any(s.get("level", 0) != level for s in tail):
+                break
+            segments = segments[:-self.fanout] + [self._merge(tail, level)]
+            self._save_manifest(segments)
+            # the old segments are removed only after the manifest
+            # switched, a crash in between leaves unused files but no
+            # lost rows
+            for segment in tail:
+                shutil.rmtree(self.directory / segment["name"],
+                              ignore_errors=True)
+
+    def _merge(self, segments: list[dict], level: int) -> dict:
+        """
+        Write the rows of the segments as one segment sorted by id and
+        timestamp.
+        """
+        arrays = {}
+        for column in ["id", "timestamp"] + self.columns:
+            arrays[column] = np.concatenate([
+                np.load(self.directory / s["name"] / f"{column}.npy",
+                        mmap_mode="r")
+                for s in segments
+            ])
+        order = np.lexsort((arrays["timestamp"], arrays["id"]))
+        arrays = {column: array[order] for column, array in arrays.items()}
+
+        seq = segments[-1].get("seq", 0)
+        name = f"seg-{int(arrays['timestamp'].max())}-L{level + 1}-{seq}"
+        merged = self._write_segment(name + ".tmp", arrays)
+        os.replace(self.directory / (name + ".tmp"), self.directory / name)
+        merged.update(name=name, seq=seq, level=level + 1)
+        return merged
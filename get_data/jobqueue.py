@@ -0,0 +1,247 @@
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+
+"""
+Durable job table for the research run.
+
+Every (token, subject, stage) job is a row in a SQLite database with its
+state (pending, running, done, failed), attempts, timings and last error.
+Worker processes claim jobs with an atomic update, so several of them can
+share one run. Jobs are keyed by the CMC id of the token, names are not
+unique. Every worker writes a heartbeat; the jobs of a worker that stopped
+or crashed are released by the next resume or by another worker, at the
+latest when their lease expired. A job is tried at most max_attempts times,
+also when it crashes its worker every time.
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    token_loc INTEGER NOT NULL,
+    cmc_id INTEGER NOT NULL,
+    token TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    last_error TEXT,
+    PRIMARY KEY (cmc_id, subject, stage)
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, token_loc);
+CREATE TABLE IF NOT EXISTS workers (
+    worker TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+"""
+
+# the extract stage can only run after the research of the same subject
+CLAIM = """
+UPDATE jobs
+SET state = 'running', attempts = attempts + 1, worker = :worker,
+    started_at = :now, finished_at = NULL
+WHERE rowid = (
+    SELECT j.rowid FROM jobs j
+    WHERE (j.state = 'pending'
+           OR (j.state = 'running' AND j.started_at < :now - :lease
+               AND j.attempts < :max_attempts))
+      AND (j.stage != 'extract' OR EXISTS (
+           SELECT 1 FROM jobs r
+           WHERE r.cmc_id = j.cmc_id AND r.subject = j.subject
+             AND r.stage = 'research' AND r.state = 'done'))
+    ORDER BY j.token_loc, j.subject, j.stage
+    LIMIT 1
+)
+RETURNING token_loc, cmc_id, token, subject, stage, attempts
+"""
+
+# running jobs of workers without a recent heartbeat
+ABANDONED = """
+state = 'running' AND (started_at < :now - :lease OR worker NOT IN (
+    SELECT worker FROM workers WHERE heartbeat >= :now - :stale)
+    OR worker IN ({dead}))
+"""
+
+
+def _dead_workers(workers: list[str]) -> list[str]:
+    """
+    Workers of this host whose process is gone. Only checked on POSIX,
+    os.kill would terminate the process on Windows.
+    """
+    if os.name != "posix":
+        return []
+    host = socket.gethostname()
+    dead = []
+    for worker in workers:
+        name, _, pid = worker.rpartition(":")
+        if name != host or not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            dead.append(worker)
+        except PermissionError:
+            pass
+    return dead
+
+
+class JobQueue:
+    """
+    SQLite backed queue of (token, subject, stage) jobs. The database file
+    can be shared by several processes; keep it on a local disk or a
+    network share with working file locks.
+    """
+
+    def __init__(self, path: Path = Path("data/jobs.sqlite"),
+                 lease: float = 30 * 60, max_attempts: int = 3,
+                 stale: float = 60):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # seconds without heartbeat after which a worker counts as gone
+        self.stale = stale
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        # autocommit, transactions are opened explicitly
+        self.conn = sqlite3.connect(self.path, timeout=60,
+                                    isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def reset(self, jobs):
+        """
+        Start a new run: replace the table with the given
+        (token_loc, cmc_id, token, subject, stage) jobs, all pending.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute("DELETE FROM jobs")
+        self.conn.executemany(
+            "INSERT INTO jobs (token_loc, cmc_id, token, subject, stage, "
+            "created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(*job, now) for job in jobs]
+        )
+        self.conn.execute("COMMIT")
+
+    def heartbeat(self):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO workers (worker, heartbeat) "
+            "VALUES (?, ?)", (self.worker, time.time()))
+
+    def leave(self):
+        """
+        Stop this worker: its running jobs go back to pending right away,
+        e.g. after Ctrl-C.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            "UPDATE jobs SET state = 'pending', worker = NULL "
+            "WHERE state = 'running' AND worker = ?", (self.worker,))
+        self.conn.execute("DELETE FROM workers WHERE worker = ?",
+                          (self.worker,))
+        self.conn.execute("COMMIT")
+
+    def release(self) -> int:
+        """
+        Hand the running jobs of stopped or crashed workers out again, or
+        fail them once they used up their attempts. Returns the number of
+        released jobs.
+        """
+        holders = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT worker FROM jobs WHERE state = 'running' "
+            "AND worker != ?", (self.worker,))]
+        dead = _dead_workers(holders)
+        where = ABANDONED.format(
+            dead=", ".join(f":dead{i}" for i in range(len(dead))) or "NULL")
+        params = {"now": time.time(), "lease": self.lease,
+                  "stale": self.stale, "max_attempts": self.max_attempts}
+        params.update((f"dead{i}", worker) for i, worker in enumerate(dead))
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            "UPDATE jobs SET state = 'failed', finished_at = :now, "
+            "last_error = 'worker stopped during the last attempt' "
+            f"WHERE attempts >= :max_attempts AND {where}", params)
+        cursor = self.conn.execute(
+            "UPDATE jobs SET state = 'pending', worker = NULL "
+            f"WHERE {where}", params)
+        self.conn.execute("COMMIT")
+        return cursor.rowcount
+
+    def claim(self) -> dict | None:
+        """
+        Atomically take the next runnable job, None if there is none.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        row = self.conn.execute(CLAIM, {"worker": self.worker,
+                                        "now": time.time(),
+                                        "lease": self.lease,
+                                        "max_attempts": self.max_attempts}
+                                ).fetchone()
+        self.conn.execute("COMMIT")
+        if row is None:
+            return None
+        return dict(zip(("token_loc", "cmc_id", "token", "subject", "stage",
+                         "attempts"), row))
+
+    def _finish(self, job: dict, state: str, error: str | None):
+        # only the worker holding the job may finish it
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, finished_at = ?, last_error = ? "
+            "WHERE cmc_id = ? AND subject = ? AND stage = ? AND worker = ?",
+            (state, time.time(), error, job["cmc_id"], job["subject"],
+             job["stage"], self.worker)
+        )
+
+    def complete(self, job: dict):
+        self._finish(job, "done", None)
+
+    def fail(self, job: dict, error: Exception | str):
+        self._finish(job, "failed", str(error))
+
+    def requeue(self) -> int:
+        """
+        Release the jobs of stopped workers and set failed jobs with
+        attempts left back to pending. Returns the number of requeued
+        jobs.
+        """
+        released = self.release()
+        cursor = self.conn.execute(
+            "UPDATE jobs SET state = 'pending' "
+            "WHERE state = 'failed' AND attempts < ?", (self.max_attempts,)
+        )
+        return released + cursor.rowcount
+
+    def running(self) -> int:
+        """
+        Jobs currently held by any worker with an active lease.
+        """
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'running' "
+            "AND started_at >= ?", (time.time() - self.lease,)
+        ).fetchone()[0]
+
+    def pending(self) -> int:
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = 'pending'"
+        ).fetchone()[0]
+
+    def status(self) -> dict:
+        rows = self.conn.execute(
+            "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+        ).fetchall()
+        return dict(rows)
+
+    def failures(self) -> list[dict]:
+        rows = self.conn.execute(
+            "SELECT token, subject, stage, attempts, last_error FROM jobs "
+            "WHERE state = 'failed' ORDER BY token_loc, subject"
+        ).fetchall()
+        return [dict(zip(("token", "subject", "stage", "attempts",
+                          "last_error"), row)) for row in rows]
@@ -1,29 +1,27 @@
 import asyncio
 import os
+import sys
 import pandas as pd
 import re
-from pathlib import Path
-import json
-from dotenv import load_dotenv
-from functions import get_erc20, research_agent, extract_data
+from get_erc20 import fetch_tokens
+from scheduler import RateLimiter, run_jobs, run_queue
+from cache import ResponseCache
+from jobqueue import JobQueue
+from session import PipelineSession
+from extraction import extraction_stats
+from merge import read_results, merge_results, save_full_data
+from history import SnapshotStore
+from aggregate import build_summaries
+from cooccurrence import build_cooccurrence
+from export import export_compact
+from sink import default_sink
+from telemetry import Telemetry, print_summary
+from routing import ModelRouter, print_routing
+from corpus import DocumentStore
+from artifacts import ArtifactStore
+from models import SUBJECT_FIELDS
 
-"""
-Get Top 50 ERC-20 Tokens from CoinMarketCap.
-"""
-# load key
-load_dotenv()
-api_key = os.getenv("X-CMC_PRO_API_KEY")
-if api_key is None:
-    raise ValueError("API Key not found")
-
-erc20_data = get_erc20(api_key, 50)
-
-# rename tokennames because later they are used as filenames
-erc20_data['name'] = erc20_data['name'].apply(lambda x: re.sub(r' ', r'_', x))
-
-erc20_data.to_csv(Path("data/erc20_data") / "erc20_data.csv",
-                  index=False,
-                  encoding="utf-8")
+tokenomics_subjects = list(SUBJECT_FIELDS)
 
 """
 Get information about the tokenomics subjects class, governance, distribution,
@@ -31,111 +29,265 @@ emissiontype, incentive, price and market, risk and security, vesting and cliff
 with OpenAI Agents SDK.
 """
 
-load_dotenv(override=True)
-api_key = os.getenv("OPENAI_API_KEY")
-if api_key is None:
-    raise ValueError("API Key not found")
 
+def research_jobs(erc20_data: pd.DataFrame) -> list[tuple]:
+    """
+    (token_loc, cmc_id, token, subject, stage) rows of the job table.
+    """
+    jobs = []
+    tokens = zip(erc20_data["id"], erc20_data["name"])
+    for token_loc, (cmc_id, token) in enumerate(tokens, start=1):
+        cmc_id = int(cmc_id)
+        # batched mode: one agent run researches all subjects of a token
+        if os.getenv("RESEARCH_MODE") == "batched":
+            jobs.append((token_loc, cmc_id, token, "all", "research_batch"))
+            continue
+        for subject in tokenomics_subjects:
+            jobs.append((token_loc, cmc_id, token, subject, "research"))
+            # batch mode: extracted by one batch after the research
+            if os.getenv("EXTRACT_MODE") != "batch":
+                jobs.append((token_loc, cmc_id, token, subject, "extract"))
+    return jobs
 
-async def main():
-    total_tokens = len(erc20_data)
 
-    tokenomics_subjects = [
-        "class",
-        "governance",
-        "distribution",
-        "emissiontype",
-        "incentive",
-        "price_and_market",
-        "risk_and_security",
-        "vesting_and_cliff"
-    ]
+def job_queue() -> JobQueue:
+    return JobQueue(os.getenv("JOBS_DB", "data/jobs.sqlite"),
+                    max_attempts=int(os.getenv("MAX_ATTEMPTS", 3)))
 
-    # for each token in the list research all subjects
-    for token_loc in range(1, total_tokens + 1):
-        for subject in tokenomics_subjects:
-            print(f"\n--- Processing {token_loc}/{total_tokens} {subject} ---")
-            try:
-                await research_agent(tokenomics_subject=subject,
-                                     token_loc=token_loc)
-                extract_data(tokenomics_subject=subject, token_loc=token_loc)
-                await asyncio.sleep(1)
-            except Exception as e:
-                print(f"Error {token_loc}, Subject '{subject}': {e}")
-                await asyncio.sleep(2)
 
+def rate_limiter() -> RateLimiter:
+    # OpenAI limits, tune them with the jobs/min report
+    return RateLimiter(
+        rpm=int(os.getenv("OPENAI_RPM", 500)),
+        tpm=int(os.getenv("OPENAI_TPM", 30000)),
+        tokens_per_request=int(os.getenv("TOKENS_PER_REQUEST", 3000))
+    )
 
-if __name__ == "__main__":
-    asyncio.run(main())
 
-"""
-Join the subject jsons to the erc20_data as final data set.
-"""
+def run_options() -> tuple:
+    """
+    Response cache, telemetry, model router and whitepaper corpus of a run,
+    each None if it is switched off.
+    """
+    # unchanged requests are answered from the cache
+    cache = None
+    if os.getenv("RESPONSE_CACHE", "on") != "off":
+        cache = ResponseCache(
+            ttl=float(os.getenv("CACHE_TTL_DAYS", 30)) * 24 * 3600
+        )
 
-tokenomics_subjects = [
-    "class",
-    "governance",
-    "distribution",
-    "emissiontype",
-    "incentive",
-    "price_and_market",
-    "risk_and_security",
-    "vesting_and_cliff"
-]
+    # latency, tokens and cost of every API call
+    telemetry = None
+    if os.getenv("METRICS_FILE", "data/metrics.jsonl") != "off":
+        telemetry = Telemetry(os.getenv("METRICS_FILE",
+                                        "data/metrics.jsonl"))
 
-all_token_dfs = []
+    # cheap model first, escalated per model_routes.json
+    router = None
+    if os.getenv("MODEL_ROUTES") != "off":
+        router = ModelRouter()
 
-# for each token
-for token in erc20_data["name"]:
+    # whitepaper sections instead of web search, see corpus.py
+    corpus = None
+    if os.getenv("CORPUS", "on") != "off":
+        corpus = DocumentStore(os.getenv("CORPUS_DIR", "data/corpus"))
 
-    subject_dfs = []
+    return cache, telemetry, router, corpus
 
-    # for each subject for each token join the rows
-    for subject in tokenomics_subjects:
-        file_path = Path("data/json_output") / f"{subject}_{token}_result.json"
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            json_data = json.load(f)
+async def run_workers(queue: JobQueue, session: PipelineSession):
+    """
+    Claim jobs from the queue until the run is finished.
+    """
+    # the agents SDK is only imported by the stages that call the API
+    from functions import research_agent, research_agent_batch, extract_data
 
-        df = pd.DataFrame(json_data["tokens"])
+    total_tokens = len(session.erc20_data)
+    # fail early without key, the clients are shared by all jobs
+    session.async_openai
+    # the instructions are the cached prefix of every prompt
+    session.load_instructions(tokenomics_subjects)
 
-        # delete dulicate columns
-        if subject == "class":
-            df = df.rename(columns={"Token": "name"})
+    concurrency = int(os.getenv("MAX_CONCURRENCY", 8))
+    limiter = rate_limiter()
+    cache, telemetry, router, corpus = run_options()
+
+    async def process(job):
+        # by CMC id, the token list may have been fetched again
+        token_loc = session.token_loc(cmc_id=job["cmc_id"])
+        subject, stage = job["subject"], job["stage"]
+        print(f"\n--- Processing {token_loc}/{total_tokens} {subject} "
+              f"{stage} (attempt {job['attempts']}) ---")
+        if stage == "research":
+            await research_agent(tokenomics_subject=subject,
+                                 token_loc=token_loc, cache=cache,
+                                 limiter=limiter, session=session,
+                                 telemetry=telemetry, router=router,
+                                 corpus=corpus)
+        elif stage == "extract":
+            await asyncio.to_thread(extract_data, tokenomics_subject=subject,
+                                    token_loc=token_loc, cache=cache,
+                                    limiter=limiter, session=session,
+                                    telemetry=telemetry, router=router)
         else:
-            df = df.drop(columns="Token")
+            await research_agent_batch(token_loc=token_loc,
+                                       tokenomics_subjects=tokenomics_subjects,
+                                       cache=cache, limiter=limiter,
+                                       session=session, telemetry=telemetry,
+                                       router=router, corpus=corpus)
+
+    # the limiter is acquired per API call, so cache hits cost no capacity
+    await run_queue(queue, process, concurrency=concurrency, limiter=limiter)
+
+    if cache:
+        cache.evict()
+        print(cache.summary())
+    print(extraction_stats.summary())
+    if telemetry:
+        print_summary(telemetry.summary())
+    if router:
+        print_routing(router.summary())
+    print_status(queue)
+
+
+def print_status(queue: JobQueue):
+    print(f"jobs: {queue.status()}")
+    for failure in queue.failures():
+        print(f"failed {failure['token']} {failure['subject']} "
+              f"{failure['stage']} after {failure['attempts']} attempts: "
+              f"{failure['last_error']}")
+
 
-        # rename duplicate column
-        if subject == "price_and_market":
-            df = df.rename(columns={"Inflationary_Supply":
-                                    "Inflationary_Supply_Price_and_Market"})
+async def main(session: PipelineSession):
+    """
+    Start a new research run for every token and subject.
+    """
+    queue = job_queue()
+    queue.reset(research_jobs(session.erc20_data))
+    # the outputs of this run go into a new run of the artifact store
+    print(f"run {session.artifacts.start_run()}")
+    await run_workers(queue, session)
 
-        subject_dfs.append(df)
 
-    # join the subjects for each token
-    merged_subjects = pd.concat(subject_dfs, axis=1)
+async def resume(session: PipelineSession):
+    """
+    Continue an interrupted run: the jobs of stopped workers and failed
+    jobs with attempts left are run again.
+    """
+    queue = job_queue()
+    requeued = queue.requeue()
+    print(f"requeued {requeued} jobs")
+    await run_workers(queue, session)
 
-    all_token_dfs.append(merged_subjects)
 
-df_all_subjects = pd.concat(all_token_dfs, axis=0, ignore_index=True)
+async def worker(session: PipelineSession):
+    """
+    Join a running research run from another process or host.
+    """
+    queue = job_queue()
+    await run_workers(queue, session)
 
-# join each token row to erc20_data
-erc20_full_data = erc20_data.merge(df_all_subjects, how="left", on="name")
 
-erc20_full_data["name"] = erc20_full_data["name"].apply(
-    lambda x: re.sub(r"_", r" ", x)
-)
+def extract_batch(session: PipelineSession):
+    """
+    Extract all agent outputs with the Batch API, see batch.py. The
+    results go into the run of the research, so that an interrupted
+    batch is resumed.
+    """
+    from batch import BatchExtraction
 
-erc20_full_data.to_csv(
-    Path("data/result") / "erc20_full_data.csv",
-    index=False
-)
+    cache, telemetry, router, _ = run_options()
+    extraction = BatchExtraction(
+        session, tokenomics_subjects, cache=cache, router=router,
+        telemetry=telemetry,
+        poll_interval=float(os.getenv("BATCH_POLL_INTERVAL", 30)))
+    print(f"batch extraction: {extraction.run()}")
+    print(extraction_stats.summary())
+    if telemetry:
+        print_summary(telemetry.summary())
+
+
+async def extract(session: PipelineSession):
+    """
+    Extract the stored agent outputs again without new research, e.g.
+    after a pydantic class changed.
+    """
+    from functions import extract_data
+
+    # the new results are a run of their own, the earlier ones are kept
+    print(f"run {session.artifacts.start_run()}")
+    # tokens and subjects with an agent output
+    outputs = {(cmc_id, subject) for cmc_id, subject, _, _ in
+               session.artifacts.scan("research", latest=True)}
+    jobs = [(token_loc, subject)
+            for token_loc in range(1, len(session.erc20_data) + 1)
+            for subject in tokenomics_subjects
+            if (session.cmc_id(token_loc), subject) in outputs]
+    limiter = rate_limiter()
+    cache, telemetry, router, _ = run_options()
+
+    async def process(job):
+        await asyncio.to_thread(extract_data, tokenomics_subject=job[1],
+                                token_loc=job[0], cache=cache,
+                                limiter=limiter, session=session,
+                                telemetry=telemetry, router=router)
+
+    await run_jobs(jobs, process, int(os.getenv("MAX_CONCURRENCY", 8)),
+                   limiter, requests_per_job=0)
+    print(extraction_stats.summary())
+    if telemetry:
+        print_summary(telemetry.summary())
+    if router:
+        print_routing(router.summary())
+
+
+"""
+Join the subject results to the erc20_data as final data set.
+"""
+
+
+def merge(erc20_data: pd.DataFrame,
+          artifacts: ArtifactStore | None = None) -> pd.DataFrame:
+    # stream all subject results into columns and join them in one step
+    artifacts = artifacts or ArtifactStore(
+        os.getenv("ARTIFACT_DB", "data/artifacts.sqlite"))
+    records = read_results(artifacts, tokenomics_subjects)
+    erc20_full_data = merge_results(erc20_data, tokenomics_subjects, records)
+
+    erc20_full_data["name"] = erc20_full_data["name"].apply(
+        lambda x: re.sub(r"_", r" ", x)
+    )
+
+    # json (default), compact or both
+    export_format = os.getenv("EXPORT_FORMAT", "json")
+    save_full_data(erc20_full_data,
+                   frontend_json=export_format in ("json", "both"))
+    if export_format in ("compact", "both"):
+        export_compact(erc20_full_data)
+    build_summaries(erc20_full_data)
+    build_cooccurrence(erc20_full_data)
+    # keep the numbers of this run for the trend charts
+    SnapshotStore().append(erc20_full_data)
+    print(default_sink().summary())
+    return erc20_full_data
+
+
+if __name__ == "__main__":
+    # python main.py [run | resume | worker]
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    session = PipelineSession()
+    if command == "run":
+        fetch_tokens(session)
+        asyncio.run(main(session))
+    elif command == "resume":
+        asyncio.run(resume(session))
+    elif command == "worker":
+        asyncio.run(worker(session))
+        sys.exit()
+    else:
+        sys.exit(f"unknown command {command}, use run, resume or worker")
 
-erc20_full_data.to_json(
-    Path(
-        r"D:\Tokenomics\frontend\tokenomics-project\src\data"
-    ) / "erc20_full_data.json",
-    orient="records",
-    force_ascii=False,
-    indent=2
-)
+    if os.getenv("EXTRACT_MODE") == "batch":
+        extract_batch(session)
+    merge(session.erc20_data, session.artifacts)
+    session.close()
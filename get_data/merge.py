@@ -0,0 +1,93 @@
+import json
+import pandas as pd
+from models import SUBJECT_FIELDS, pydantic_class
+from sink import OutputSink, default_sink
+
+"""
+Columnar merge of the subject results onto the token list.
+
+The records of every (token, subject) result are streamed into one column
+array per output column and the final table is built in a single step,
+instead of one small DataFrame per result file and repeated concats.
+"""
+
+# declarative column mapping: result field -> output column, None drops it
+COLUMN_MAP = {subject: {"Token": None} for subject in SUBJECT_FIELDS}
+# the emission type subject has a column of the same name
+COLUMN_MAP["price_and_market"]["Inflationary_Supply"] = \
+    "Inflationary_Supply_Price_and_Market"
+
+
+def subject_columns(subject: str) -> list[tuple[str, str]]:
+    """
+    (field, column) pairs of a subject in the order of its pydantic class.
+    """
+    profile = pydantic_class(subject).model_fields["tokens"] \
+        .annotation.__args__[0]
+    mapping = COLUMN_MAP.get(subject, {})
+    return [(field, mapping.get(field, field)) for field in
+            profile.model_fields if mapping.get(field, field) is not None]
+
+
+def read_results(artifacts, tokenomics_subjects, run: str | None = None):
+    """
+    Stream (cmc_id, subject, record) of the newest extract artifacts up to
+    the run from one scan of the artifact store. Missing results leave the
+    columns of that token empty.
+    """
+    subjects = set(tokenomics_subjects)
+    for cmc_id, subject, _, content in artifacts.scan("extract", run,
+                                                      latest=True):
+        if subject not in subjects:
+            continue
+        for record in json.loads(content)["tokens"][:1]:
+            yield cmc_id, subject, record
+
+
+def merge_results(erc20_data: pd.DataFrame, tokenomics_subjects,
+                  records) -> pd.DataFrame:
+    """
+    Left join the streamed records onto erc20_data by CMC id. Each token
+    gets one row, the first record of a result is used.
+    """
+    n = len(erc20_data)
+    row_of = {int(cmc_id): i for i, cmc_id in enumerate(erc20_data["id"])}
+    mapping = {subject: subject_columns(subject)
+               for subject in tokenomics_subjects}
+
+    # one preallocated array per output column
+    columns = {column: [None] * n
+               for subject in tokenomics_subjects
+               for _, column in mapping[subject]}
+
+    for cmc_id, subject, record in records:
+        i = row_of.get(cmc_id)
+        if i is None:
+            continue
+        for field, column in mapping[subject]:
+            columns[column][i] = record.get(field)
+
+    subject_data = pd.DataFrame(columns)
+    return pd.concat([erc20_data.reset_index(drop=True), subject_data],
+                     axis=1)
+
+
+def save_full_data(erc20_full_data: pd.DataFrame, frontend_json=True,
+                   sink: OutputSink | None = None):
+    """
+    Write the final data set for process_supply.py and the frontend.
+    """
+    sink = sink or default_sink()
+    sink.write(erc20_full_data.to_csv(index=False),
+               result="erc20_full_data.csv")
+    if not frontend_json:
+        return
+
+    sink.write(
+        erc20_full_data.to_json(
+            orient="records",
+            force_ascii=False,
+            indent=2
+        ),
+        frontend="erc20_full_data.json"
+    )
@@ -0,0 +1,175 @@
+import json
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+"""
+Local stand-in for the CoinMarketCap API to test the fetch offline.
+
+The listings are generated deterministically from a seed, a share of them
+on the ethereum platform, the project links of the info endpoint from the
+id. Rate limit and server errors can be injected.
+
+python mock_cmc.py [port]
+then set CMC_BASE_URL=http://127.0.0.1:<port>
+"""
+
+
+def make_listings(count: int = 5000, erc20_share: float = 0.3,
+                  seed: int = 42) -> list[dict]:
+    rng = random.Random(seed)
+    listings = []
+    market_cap = 1e12
+    for i in range(1, count + 1):
+        market_cap *= rng.uniform(0.97, 0.999)
+        price = 10 ** rng.uniform(-6, 4)
+        circulating = market_cap / price
+        total = circulating * rng.uniform(1, 1.5)
+        on_ethereum = rng.random() < erc20_share
+        listings.append({
+            "id": i,
+            "symbol": f"T{i}",
+            "name": f"Token {i}",
+            "circulating_supply": circulating,
+            "total_supply": total,
+            "max_supply": total * 2 if rng.random() < 0.4 else None,
+            "platform": {
+                "slug": "ethereum",
+                "token_address": f"0x{i:040x}"
+            } if on_ethereum else None,
+            "quote": {"USD": {"price": price, "market_cap": market_cap}}
+        })
+    return listings
+
+
+class MockCMCServer:
+    """
+    Serves the listings and quotes endpoints in a background thread.
+    Use as context manager, base_url is the address to pass as
+    CMC_BASE_URL.
+    """
+
+    def __init__(self, listings: list[dict] | None = None, port: int = 0,
+                 error_rate: float = 0.0, seed: int = 42):
+        self.listings = listings if listings is not None else make_listings()
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", port),
+                                          self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                mock.calls += 1
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+                if "X-CMC_PRO_API_KEY" not in self.headers:
+                    return self._send(401, {"status": {
+                        "error_message": "API key missing"}})
+                if mock.rng.random() < mock.error_rate:
+                    status = mock.rng.choice([429, 500, 503])
+                    return self._send(status, {"status": {
+                        "error_code": status}}, {"Retry-After": "0"})
+
+                route = mock.routes().get(url.path)
+                if route is None:
+                    return self._send(404, {"status": {
+                        "error_message": f"{url.path} not found"}})
+                data, credits = route(params)
+                self._send(200, {"status": {"error_code": 0,
+                                            "credit_count": credits},
+                                 "data": data})
+
+        return Handler
+
+    def routes(self) -> dict:
+        return {
+            "/v1/cryptocurrency/listings/latest": self.listings_latest,
+            "/v2/cryptocurrency/quotes/latest": self.quotes_latest,
+            "/v2/cryptocurrency/info": self.info
+        }
+
+    def listings_latest(self, params: dict):
+        start = int(params.get("start", 1))
+        limit = int(params.get("limit", 100))
+        data = self.listings[start - 1:start - 1 + limit]
+        return data, max(1, -(-len(data) // 200))
+
+    def quotes_latest(self, params: dict):
+        by_id = {str(c["id"]): c for c in self.listings}
+        ids = params.get("id", "").split(",")
+        data = {i: by_id[i] for i in ids if i in by_id}
+        return data, max(1, -(-len(ids) // 100))
+
+    def info(self, params: dict):
+        """
+        Project links of the ids, most with a whitepaper, some with a
+        documentation site as second technical document.
+        """
+        by_id = {str(c["id"]): c for c in self.listings}
+        ids = params.get("id", "").split(",")
+        data = {}
+        for i in ids:
+            if i not in by_id:
+                continue
+            # the same links for an id on every call
+            rng = random.Random(int(i))
+            site = f"https://token{i}.example.org"
+            docs = [f"{site}/whitepaper.pdf"] if rng.random() < 0.8 else []
+            if docs and rng.random() < 0.5:
+                docs.append(f"https://docs.token{i}.example.org")
+            data[i] = {"id": by_id[i]["id"], "name": by_id[i]["name"],
+                       "symbol": by_id[i]["symbol"],
+                       "urls": {"website": [site], "technical_doc": docs,
+                                "source_code": []}}
+        return data, max(1, -(-len(ids) // 100))
+
+    def drift(self, volatility: float = 0.02):
+        """
+        Move prices and market caps randomly, like a minute of trading.
+        """
+        for c in self.listings:
+            factor = self.rng.lognormvariate(0, volatility)
+            c["quote"]["USD"]["price"] *= factor
+            c["quote"]["USD"]["market_cap"] *= factor
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    with MockCMCServer(port=port) as mock:
+        print(f"mock CoinMarketCap on {mock.base_url}")
+        mock.thread.join()
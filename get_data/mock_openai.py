@@ -0,0 +1,419 @@
+import json
+import random
+import re
+import sys
+import threading
+import time
+import zipfile
+import zlib
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from models import SUBJECT_FIELDS
+
+"""
+Local stand-in for the OpenAI Responses API to run the pipeline offline.
+
+Agent runs (research_agent) are answered with the recorded agent outputs
+of data/text_output.zip, parsing calls (extract_data) with the recorded
+results of data/json_output.zip. Tokens without a recording get the one of
+a recorded token chosen by their name, so any token list can be replayed.
+Latency and 429/5xx errors can be injected. The Files and Batches
+endpoints run a batch of responses requests in a background thread, the
+injected errors then end up in the error file of the batch. Prompt caching
+is simulated like the API does it: a request whose prefix of at least 1024
+tokens was seen before reports that prefix, in steps of 128 tokens, as
+cached.
+
+Requests are told apart by their stage: parsing calls by the agent output
+in their input, batched research runs (RESEARCH_MODE=batched) by the
+"### Subject:" sections of their instructions, which are answered with the
+recorded results of all their subjects, and single-subject research runs
+by the instruction text of their subject.
+
+python mock_openai.py [port]
+then set OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+"""
+
+SUBJECTS = list(SUBJECT_FIELDS)
+
+# start of the agent output in the input of a parsing call
+EXTRACT_MARKER = "Here is the text from the AI agent:\n"
+
+# prompt caching of the API, in tokens
+MIN_CACHED_PREFIX = 1024
+CACHE_STEP = 128
+
+
+def load_recordings(text_zip: Path = Path("data/text_output.zip"),
+                    json_zip: Path = Path("data/json_output.zip")) -> dict:
+    """
+    {(subject, token): (agent output, result json)} of the recorded run.
+    """
+    pattern = re.compile(rf"^(?:text|json)_output/({'|'.join(SUBJECTS)})_"
+                         r"(.+)_result\.(?:txt|json)$")
+    recordings = {}
+    for archive, index in ((text_zip, 0), (json_zip, 1)):
+        with zipfile.ZipFile(archive) as z:
+            for name in z.namelist():
+                match = pattern.match(name)
+                if match:
+                    entry = recordings.setdefault(match.groups(),
+                                                  [None, None])
+                    entry[index] = z.read(name).decode("utf-8")
+    return {key: tuple(value) for key, value in recordings.items()
+            if None not in value}
+
+
+class MockOpenAIServer:
+    """
+    Serves POST /v1/responses in a background thread. Use as context
+    manager, base_url is the address to pass as OPENAI_BASE_URL.
+    """
+
+    def __init__(self, recordings: dict | None = None,
+                 instruction_dir: Path = Path("instructions"),
+                 port: int = 0, research_latency: float = 0.0,
+                 extract_latency: float = 0.0, error_rate: float = 0.0,
+                 batch_latency: float = 0.0, seed: int = 42):
+        self.recordings = recordings if recordings is not None \
+            else load_recordings()
+        self.tokens = sorted({token for _, token in self.recordings})
+        self.by_output = {_normalize(text): result for text, result
+                          in self.recordings.values()}
+        self.instructions = {
+            subject: (Path(instruction_dir) /
+                      f"{subject}_instruction.txt").read_text(
+                          encoding="utf-8").strip()
+            for subject in SUBJECTS
+        }
+        self.research_latency = research_latency
+        self.extract_latency = extract_latency
+        self.error_rate = error_rate
+        self.batch_latency = batch_latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {"research": 0, "extract": 0, "errors": 0,
+                      "batches": 0}
+        self.prefixes = set()
+        self.files = {}
+        self.batches = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", port),
+                                          self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def recorded_token(self, token: str) -> str:
+        # same replacement for the same name on every run
+        if token in self.tokens:
+            return token
+        return self.tokens[zlib.crc32(token.encode()) % len(self.tokens)]
+
+    def _count(self, kind: str) -> float:
+        """
+        Count the call, return the latency to simulate.
+        """
+        with self.lock:
+            self.calls[kind] += 1
+            latency = (self.research_latency if kind == "research"
+                       else self.extract_latency)
+            return latency * self.rng.lognormvariate(0, 0.3) \
+                if latency else 0.0
+
+    def _fail(self) -> int | None:
+        with self.lock:
+            if self.rng.random() >= self.error_rate:
+                return None
+            self.calls["errors"] += 1
+            return self.rng.choice([429, 500, 503])
+
+    def cached_tokens(self, body: dict) -> int:
+        """
+        Tokens of the request prefix that a previous request already sent,
+        everything but the last input message.
+        """
+        prefix = _prefix(body)
+        tokens = len(prefix) // 4
+        if tokens < MIN_CACHED_PREFIX:
+            return 0
+        key = zlib.crc32(prefix.encode())
+        with self.lock:
+            if key not in self.prefixes:
+                self.prefixes.add(key)
+                return 0
+        return tokens - tokens % CACHE_STEP
+
+    def answer(self, body: dict) -> tuple[int, dict]:
+        """
+        Status and payload of a responses.create/parse request.
+        """
+        request_text = _request_text(body)
+
+        if EXTRACT_MARKER in request_text:
+            time.sleep(self._count("extract"))
+            agent_output = request_text.split(EXTRACT_MARKER, 1)[-1]
+            result = self.by_output.get(_normalize(agent_output))
+            if result is None:
+                return 400, _error("unknown agent output")
+            return 200, _response(body, result, request_text,
+                                  self.cached_tokens(body))
+
+        time.sleep(self._count("research"))
+        match = re.search(r"Tokenname: (\S+?)!", request_text)
+        if match is None:
+            return 400, _error("unknown research prompt")
+        token = self.recorded_token(match.group(1))
+
+        subjects = re.findall(r"### Subject: (\w+)$",
+                              body.get("instructions") or "", re.MULTILINE)
+        if subjects:
+            # one section per subject, the recorded result of each
+            output = {}
+            for subject in subjects:
+                result = json.loads(self.recordings[(subject, token)][1])
+                for record in result["tokens"]:
+                    record["Token"] = match.group(1)
+                output[subject] = result
+            return 200, _response(body, json.dumps(output), request_text,
+                                  self.cached_tokens(body))
+
+        subject = next((s for s, instruction in self.instructions.items()
+                        if instruction in request_text), None)
+        if subject is None:
+            return 400, _error("unknown research prompt")
+        output = self.recordings[(subject, token)][0]
+        return 200, _response(body, output, request_text,
+                              self.cached_tokens(body))
+
+    def create_file(self, content: bytes, filename: str,
+                    purpose: str) -> dict:
+        with self.lock:
+            file_id = f"file-mock{len(self.files):05d}"
+            self.files[file_id] = {
+                "id": file_id, "object": "file", "bytes": len(content),
+                "created_at": int(time.time()), "filename": filename,
+                "purpose": purpose, "status": "processed",
+                "content": content
+            }
+        return self.file_object(file_id)
+
+    def file_object(self, file_id: str) -> dict:
+        return {k: v for k, v in self.files[file_id].items()
+                if k != "content"}
+
+    def create_batch(self, body: dict) -> tuple[int, dict]:
+        if body.get("input_file_id") not in self.files:
+            return 400, _error("input file not found")
+        with self.lock:
+            self.calls["batches"] += 1
+            batch_id = f"batch_mock{len(self.batches):05d}"
+            self.batches[batch_id] = {
+                "id": batch_id, "object": "batch",
+                "endpoint": body.get("endpoint"),
+                "completion_window": body.get("completion_window", "24h"),
+                "input_file_id": body["input_file_id"],
+                "metadata": body.get("metadata"),
+                "created_at": int(time.time()), "status": "validating",
+                "output_file_id": None, "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0}
+            }
+        threading.Thread(target=self._run_batch, args=(batch_id,),
+                         daemon=True).start()
+        return 200, dict(self.batches[batch_id])
+
+    def _run_batch(self, batch_id: str):
+        batch = self.batches[batch_id]
+        lines = [json.loads(line) for line in
+                 self.files[batch["input_file_id"]]["content"]
+                 .decode("utf-8").splitlines() if line.strip()]
+        batch["request_counts"]["total"] = len(lines)
+        batch["status"] = "in_progress"
+        time.sleep(self.batch_latency)
+
+        output, errors = [], []
+        for n, line in enumerate(lines):
+            status = self._fail()
+            if status is None:
+                status, payload = self.answer(line["body"])
+            else:
+                payload = _error("injected error")
+            (output if status == 200 else errors).append(json.dumps({
+                "id": f"batch_req_{n}", "custom_id": line["custom_id"],
+                "response": {"status_code": status,
+                             "request_id": f"req_{n}", "body": payload},
+                "error": None
+            }))
+        counts = batch["request_counts"]
+        counts["completed"], counts["failed"] = len(output), len(errors)
+        for key, part in (("output_file_id", output),
+                          ("error_file_id", errors)):
+            if part:
+                content = ("\n".join(part) + "\n").encode("utf-8")
+                batch[key] = self.create_file(
+                    content, f"{batch_id}_{key}.jsonl",
+                    "batch_output")["id"]
+        batch["status"] = "completed"
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if "Authorization" not in self.headers:
+                    return self._send(401, _error("API key missing"))
+                match = re.fullmatch(r"/v1/batches/([\w-]+)", path)
+                if match and match.group(1) in mock.batches:
+                    return self._send(200,
+                                      dict(mock.batches[match.group(1)]))
+                match = re.fullmatch(r"/v1/files/([\w-]+)/content", path)
+                if match and match.group(1) in mock.files:
+                    content = mock.files[match.group(1)]["content"]
+                    self.send_response(200)
+                    self.send_header("Content-Type",
+                                     "application/octet-stream")
+                    self.send_header("Content-Length", str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                    return
+                self._send(404, _error(f"{self.path} not found"))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length)
+                path = self.path.split("?")[0].rstrip("/")
+                if "Authorization" not in self.headers:
+                    return self._send(401, _error("API key missing"))
+                if path == "/v1/files":
+                    fields = _multipart(self.headers["Content-Type"], raw)
+                    filename, content = fields["file"]
+                    return self._send(200, mock.create_file(
+                        content, filename,
+                        fields["purpose"][1].decode("utf-8")))
+                body = json.loads(raw or b"{}")
+                if path == "/v1/batches":
+                    return self._send(*mock.create_batch(body))
+                if path != "/v1/responses":
+                    return self._send(404, _error(f"{self.path} not found"))
+                status = mock._fail()
+                if status is not None:
+                    return self._send(status, _error("injected error"),
+                                      {"Retry-After": "0"})
+                self._send(*mock.answer(body))
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _request_text(body: dict) -> str:
+    """
+    Instructions and input messages of a request as one text.
+    """
+    parts = [body.get("instructions") or ""]
+    messages = body.get("input")
+    if isinstance(messages, str):
+        messages = [{"content": messages}]
+    for message in messages or []:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content)
+        parts.append(content)
+    return "\n".join(parts)
+
+
+def _multipart(content_type: str, raw: bytes) -> dict:
+    """
+    {name: (filename, content)} of a multipart/form-data upload.
+    """
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + raw)
+    return {part.get_param("name", header="content-disposition"):
+            (part.get_filename(), part.get_payload(decode=True))
+            for part in message.iter_parts()}
+
+
+def _normalize(text: str) -> str:
+    # the text files are read back with universal newlines
+    return text.replace("\r\n", "\n").strip()
+
+
+def _error(message: str) -> dict:
+    return {"error": {"message": message, "type": "mock_error"}}
+
+
+def _prefix(body: dict) -> str:
+    """
+    Model, tools, output format, instructions and all input messages but
+    the last one, the part of a request the API can cache.
+    """
+    messages = body.get("input")
+    if isinstance(messages, str):
+        messages = []
+    return json.dumps([body.get("model"), body.get("tools"),
+                       body.get("text"), body.get("instructions"),
+                       (messages or [])[:-1]], sort_keys=True)
+
+
+def _response(body: dict, text: str, request_text: str,
+              cached_tokens: int = 0) -> dict:
+    # about four characters per token
+    input_tokens = len(request_text) // 4
+    output_tokens = len(text) // 4
+    return {
+        "id": f"resp_{zlib.crc32(text.encode()):08x}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "status": "completed",
+        "output": [{
+            "type": "message",
+            "id": "msg_mock",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text,
+                         "annotations": []}]
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": cached_tokens},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens
+        }
+    }
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    with MockOpenAIServer(port=port) as mock:
+        print(f"mock OpenAI on {mock.base_url}")
+        mock.thread.join()
@@ -0,0 +1,222 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+"""
+pydantic classes of the tokenomics subjects.
+
+They validate the agent outputs and the extracted results and define the
+columns of the merged data set. Kept apart from functions.py, so that the
+merge and the charts do not import the agents SDK.
+"""
+
+
+# Emissiontype
+class TokenEmissionProfile(BaseModel):
+    Token: str
+    Fixed_Supply_Hard_Cap: int
+    Halvening_Exponential_Decay: int
+    Linear_Emission: int
+    Staged_Vesting_Supply: int
+    Inflationary_Supply: int
+    Bonding_Curve_Issuance: int
+    Rebase_Elastic_Supply: int
+    Mint_Burn_On_Demand: int
+    Dynamic_Staking_Supply: int
+    DAO_Governance_Controlled: int
+    Continuous_Auction_Streaming: int
+    Other_Emission: int
+    Information_Emission: str
+    Uncertainty_Emission: Optional[str]
+
+
+class EmissiontypeModel(BaseModel):
+    tokens: List[TokenEmissionProfile]
+
+
+# Governance Mechanism
+class TokenGovernanceProfile(BaseModel):
+    Token: str
+    On_Chain_Governance: int
+    Off_Chain_Governance: int
+    DAO_Governance: int
+    Delegated_Voting: int
+    Quadratic_Voting: int
+    Multi_Signature_Control: int
+    Council_Based_Governance: int
+    Proposal_Voting_Systems: int
+    Time_Locked_Governance: int
+    Community_Treasury_Voting: int
+    Other_Governance: int
+    Information_Governance: str
+    Uncertainty_Governance: Optional[str]
+
+
+class GovernanceModel(BaseModel):
+    tokens: List[TokenGovernanceProfile]
+
+
+# Class
+class TokenClassProfile(BaseModel):
+    Token: str
+    Payment_Token: int
+    Utility_Token: int
+    Investment_Token: int
+    Other_Class: int
+    Information_Class: str
+    Uncertainty_Class: Optional[str]
+
+
+class TokenClassModel(BaseModel):
+    tokens: List[TokenClassProfile]
+
+
+# Distribution
+class TokenDistributionProfile(BaseModel):
+    Token: str
+    Airdrops: int
+    Initial_Coin_Offering: int
+    Initial_Exchange_Offering: int
+    Security_Token_Offering: int
+    Initial_DEX_Offering: int
+    Liquidity_Bootstrapping_Pool: int
+    Fair_Launch: int
+    Direct_Sale: int
+    Community_Incentives: int
+    Bounty_Programs: int
+    Other_Distribution: int
+    Information_Distribution: str
+    Uncertainty_Distribution: Optional[str]
+
+
+class DistributionModel(BaseModel):
+    tokens: List[TokenDistributionProfile]
+
+
+# Incentive
+class TokenIncentiveProfile(BaseModel):
+    Token: str
+    Staking_Rewards: int
+    Liquidity_Mining: int
+    Governance_Token_Systems: int
+    Yield_Farming: int
+    Token_Based_User_Rewards: int
+    Other_Incentive: int
+    Information_Incentive: str
+    Uncertainty_Incentive: Optional[str]
+
+
+class IncentiveModel(BaseModel):
+    tokens: List[TokenIncentiveProfile]
+
+
+# Price and Market
+class TokenMarketMechanismProfile(BaseModel):
+    Token: str
+    Fixed_Supply: int
+    Inflationary_Supply: int
+    Deflationary_Mechanisms: int
+    Halving_or_Exponential_Decay: int
+    Dynamic_Minting_and_Burning: int
+    Bonding_Curves: int
+    Continuous_Auctions_and_Streaming: int
+    Vesting_and_Staged_Releases: int
+    AMM_Pricing: int
+    DAO_Governance_Controlled_Pricing: int
+    Other_Price_and_Market: int
+    Information_Price_and_Market: str
+    Uncertainty_Price_and_Market: Optional[str]
+
+
+class MarketMechanismModel(BaseModel):
+    tokens: List[TokenMarketMechanismProfile]
+
+
+# Risk and Security
+class TokenRiskSecurityProfile(BaseModel):
+    Token: str
+    Smart_Contract_Audits: int
+    Bug_Bounty_Programs: int
+    Multi_Signature_Wallets: int
+    Insurance_Funds: int
+    Decentralized_Governance: int
+    Rate_Limiting_and_Circuit_Breakers: int
+    Token_Vesting_and_Lockups: int
+    Oracle_Security: int
+    Slashing_Mechanisms: int
+    KYC_AML_Compliance: int
+    Other_Risk_and_Security: int
+    Information_Risk_and_Security: str
+    Uncertainty_Risk_and_Security: Optional[str]
+
+
+class RiskSecurityModel(BaseModel):
+    tokens: List[TokenRiskSecurityProfile]
+
+
+# Vesting and Cliff
+class TokenVestingCliffProfile(BaseModel):
+    Token: str
+    Cliff_Period: int
+    Linear_Vesting: int
+    Graded_Vesting: int
+    Milestone_Based_Vesting: int
+    Hybrid_Vesting: int
+    Revocable_Vesting: int
+    Non_Revocable_Vesting: int
+    Team_Founder_Vesting: int
+    Investor_Vesting: int
+    Community_Incentive_Vesting: int
+    Other_Vesting_and_Cliff: int
+    Information_Vesting_and_Cliff: str
+    Uncertainty_Vesting_and_Cliff: Optional[str]
+
+
+class VestingCliffModel(BaseModel):
+    tokens: List[TokenVestingCliffProfile]
+
+
+# All subjects of one token
+class TokenomicsModel(BaseModel):
+    token_class: Optional[TokenClassModel] = Field(alias="class")
+    governance: Optional[GovernanceModel]
+    distribution: Optional[DistributionModel]
+    emissiontype: Optional[EmissiontypeModel]
+    incentive: Optional[IncentiveModel]
+    price_and_market: Optional[MarketMechanismModel]
+    risk_and_security: Optional[RiskSecurityModel]
+    vesting_and_cliff: Optional[VestingCliffModel]
+
+
+# attribute of each subject in TokenomicsModel
+SUBJECT_FIELDS = {
+    "class": "token_class",
+    "governance": "governance",
+    "distribution": "distribution",
+    "emissiontype": "emissiontype",
+    "incentive": "incentive",
+    "price_and_market": "price_and_market",
+    "risk_and_security": "risk_and_security",
+    "vesting_and_cliff": "vesting_and_cliff"
+}
+
+
+def pydantic_class(subject: str) -> type[BaseModel]:
+    """
+    This function selects the correct data structure for each Tokenomic topic.
+    """
+    if subject == "emissiontype":
+        return EmissiontypeModel
+    elif subject == "governance":
+        return GovernanceModel
+    elif subject == "class":
+        return TokenClassModel
+    elif subject == "distribution":
+        return DistributionModel
+    elif subject == "incentive":
+        return IncentiveModel
+    elif subject == "price_and_market":
+        return MarketMechanismModel
+    elif subject == "risk_and_security":
+        return RiskSecurityModel
+    elif subject == "vesting_and_cliff":
+        return VestingCliffModel
@@ -2,254 +2,164 @@ import numpy as np
 import json
 import pandas as pd
 from pathlib import Path
+from sink import OutputSink, default_sink
 
 """
 This file contains the preprocessing of the Total Supply, Maximum Supply and
 Circurlating Supply Chart. For each chart the values are logged, bined and
 saved in the corresponding json format for each chart.
-"""
-"""
-Total Supply
-"""
-# load data
-df = pd.read_csv(Path("./data/result/erc20_full_data.csv"))
-tokens = df[["name", "total_supply"]].to_dict(orient="records")
 
-# log total supply
-vals = np.array([t["total_supply"] for t in tokens], dtype=float)
-logs = np.log(vals)
+All supply columns are binned together in one vectorized pass. Missing,
+zero and negative values are handled the same way for every column: they
+get no bin (bin_idx -1), or their own bucket if the chart defines one.
+"""
 
 # set metrics
-bin_width = 0.5
-log_base = "e"
-lo = np.floor(logs.min())
-hi = np.ceil(logs.max())
-edges = np.arange(np.floor(logs.min()),
-                  np.ceil(logs.max()) + bin_width,
-                  bin_width)
-counts, _ = np.histogram(logs, bins=edges)
-
+BIN_WIDTH = 0.5
+LOG_BASE = "e"
 
-# alter format for more readability on the chart
-def human_format(num):
-    for unit in ['', 'k', 'M', 'B', 'T']:
-        if abs(num) < 1000:
-            return f"{num:.0f} {unit}".strip()
-        num /= 1000
-    return "T+"  # if >1e15
-
-
-def fmt_range(a, b):
-    lo_val = np.exp(a)
-    hi_val = np.exp(b)
-    return f"{human_format(lo_val)} – {human_format(hi_val)}"
-
-
-bin_labels = [fmt_range(edges[i], edges[i+1]) for i in range(len(edges)-1)]
-
-bin_idx = np.digitize(logs, edges) - 1
-
-# save the processed data
-data = {
-    "total_tokens": len(tokens),
-    "log_base": log_base,
-    "bin_edges": edges.tolist(),
-    "bin_counts": counts.tolist(),
-    "bin_labels": bin_labels,
-    "tokens": [
-        {
-            "name": t["name"],
-            "total_supply": float(val),
-            "log_supply": round(log, 4),
-            "bin_idx": int(idx)
-        }
-        for t, val, log, idx in zip(tokens, vals, logs, bin_idx)
-    ]
+# supply column: (file in data/result, file in the frontend, missing bucket)
+SUPPLY_CHARTS = {
+    "total_supply": ("total_supply_chart.json",
+                     "total_supply_chart.json", None),
+    "max_supply": ("max_supply_chart.json",
+                   "max_supply_chart.json", "No max supply"),
+    "circulating_supply": ("circulating_supply.json",
+                           "circulating_supply_chart.json", None)
 }
 
-json_str = json.dumps(data, indent=2)
-print(json_str)
+UNITS = np.array(["", "k", "M", "B", "T"])
 
-with open(Path("data/result") / "total_supply_chart.json", "w") as f:
-    f.write(json_str)
 
-out_path = (
-    Path(r"D:\Tokenomics\frontend\tokenomics-project\src\data")
-    / "total_supply_chart.json"
-)
-
-with open(out_path, "w", encoding="utf-8") as f:
-    f.write(json_str)
-
-
-"""
-Maximum Supply
-"""
-# load data
-tokens = df[["name", "max_supply"]].to_dict(orient="records")
-
-# set metrics
-BIN_WIDTH = 0.5
-LOG_BASE = "e"
-INCLUDE_NO_MAX_BAR = True
-
-clean_vals = []
-clean_names = []
-missing_names = []
-
-# check for missing maximum supply
-for t in tokens:
-    name = t.get("name")
-    v = t.get("max_supply")
-    try:
-        v = float(v)
-        if not np.isfinite(v) or v <= 0:
-            missing_names.append(name)
-        else:
-            clean_vals.append(v)
-            clean_names.append(name)
-    except Exception:
-        missing_names.append(name)
-
-clean_vals = np.array(clean_vals, dtype=float)
-
-# append to result if missing
-if clean_vals.size == 0:
-    data = {
-        "total_tokens": len(tokens),
-        "log_base": LOG_BASE,
-        "bin_edges": [],
-        "bin_counts": [len(missing_names)] if INCLUDE_NO_MAX_BAR else [],
-        "bin_labels": ["No max supply"] if INCLUDE_NO_MAX_BAR else [],
-        "tokens": [
-            {"name": n, "max_supply": None, "log_supply": None, "bin_idx": -1}
-            for n in missing_names
-        ]
-    }
-
-# log max supply if and append to result if its not missing
-else:
-    logs = np.log(clean_vals)
-    lo = np.floor(logs.min())
-    hi = np.ceil(logs.max())
-    edges = np.arange(lo, hi + BIN_WIDTH, BIN_WIDTH)
-
-    if edges.size < 2:
-        edges = np.array([lo, lo + BIN_WIDTH])
-
-    counts, _ = np.histogram(logs, bins=edges)
-    bin_labels = [fmt_range(edges[i], edges[i+1]) for i in range(len(edges)-1)]
-    bin_idx = np.digitize(logs, edges) - 1
-
-    # Prepare the output list for tokens with valid max_supply values
-    tokens_out = []
-
-    for name, val, lg, idx in zip(clean_names, clean_vals, logs, bin_idx):
-        tokens_out.append({
-            "name": name,
-            "max_supply": float(val),
-            "log_supply": float(np.round(lg, 4)),
-            "bin_idx": int(idx)
-        })
-
-    for name in missing_names:
-        tokens_out.append({
-            "name": name,
-            "max_supply": None,
-            "log_supply": None,
-            "bin_idx": -1
-        })
-
-    if INCLUDE_NO_MAX_BAR and len(missing_names) > 0:
-        bin_labels = ["No max supply"] + bin_labels
-        counts = np.concatenate([[len(missing_names)], counts])
-
-        for obj in tokens_out:
-            if obj["bin_idx"] is not None and obj["bin_idx"] >= 0:
-                obj["bin_idx"] += 1
-
-        for obj in tokens_out:
-            if obj["bin_idx"] == -1:
-                obj["bin_idx"] = 0
-
-    # save the processed data
-    data = {
-        "total_tokens": len(tokens),
+# alter format for more readability on the chart
+def human_format(nums: np.ndarray) -> np.ndarray:
+    """
+    Vectorized "12 M" style labels, "T+" above 1e15.
+    """
+    nums = np.asarray(nums, dtype=float)
+    # number of thousands steps, 5 means beyond T
+    steps = np.searchsorted([1e3, 1e6, 1e9, 1e12, 1e15], np.abs(nums),
+                            side="right")
+    scaled = nums / 1000.0 ** np.minimum(steps, 4)
+    labels = np.char.strip(np.char.add(
+        np.char.add(np.char.mod("%.0f", scaled), " "),
+        UNITS[np.minimum(steps, 4)]
+    ))
+    return np.where(steps > 4, "T+", labels)
+
+
+def fmt_range(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """
+    Labels of log bins from their lower and upper edges.
+    """
+    return np.char.add(np.char.add(human_format(np.exp(lo)), " – "),
+                       human_format(np.exp(hi)))
+
+
+def log_bins(values: np.ndarray, bin_width: float = BIN_WIDTH) -> dict:
+    """
+    Bin the log of each column of values (rows x columns) in one pass.
+    Returns per column arrays: lower edge, number of bins, bin index of
+    each row (-1 for missing or non-positive values) and bin counts.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = np.isfinite(values) & (values > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.where(valid, np.log(np.where(valid, values, 1.0)), np.nan)
+
+    has_values = valid.any(axis=0)
+    lo = np.floor(np.where(valid, logs, np.inf).min(axis=0, initial=np.inf))
+    hi = np.ceil(np.where(valid, logs, -np.inf).max(axis=0, initial=-np.inf))
+    lo = np.where(has_values, lo, 0.0)
+    hi = np.where(has_values, hi, 0.0)
+    n_bins = np.where(
+        has_values,
+        np.maximum(np.rint((hi - lo) / bin_width).astype(int), 1),
+        0
+    )
+
+    # uniform edges, so the bin is the floor of the distance to lo
+    bin_idx = np.floor((np.where(valid, logs, lo) - lo) / bin_width)
+    bin_idx = np.clip(bin_idx, 0, np.maximum(n_bins - 1, 0)).astype(int)
+    bin_idx = np.where(valid, bin_idx, -1)
+
+    # one bincount over all columns, shifted by the bins before them
+    offsets = np.concatenate([[0], np.cumsum(n_bins)[:-1]])
+    flat = (bin_idx + offsets)[valid]
+    all_counts = np.bincount(flat, minlength=int(n_bins.sum()))
+    counts = np.split(all_counts, np.cumsum(n_bins)[:-1])
+
+    return {"lo": lo, "n_bins": n_bins, "logs": logs, "valid": valid,
+            "bin_idx": bin_idx, "counts": counts}
+
+
+def chart_data(names: np.ndarray, column: str, values: np.ndarray,
+               bins: dict, i: int, missing_label: str | None,
+               bin_width: float = BIN_WIDTH) -> dict:
+    """
+    Chart json of column i of the binned values. Tokens with a value come
+    first, followed by the missing ones.
+    """
+    valid = bins["valid"][:, i]
+    n_bins = int(bins["n_bins"][i])
+    edges = bins["lo"][i] + np.arange(n_bins + 1) * bin_width \
+        if n_bins else np.array([])
+    counts = bins["counts"][i]
+    labels = fmt_range(edges[:-1], edges[1:]) if n_bins else np.array([])
+    bin_idx = bins["bin_idx"][:, i]
+
+    n_missing = int((~valid).sum())
+    if missing_label and n_missing > 0:
+        labels = np.concatenate([[missing_label], labels])
+        counts = np.concatenate([[n_missing], counts])
+        bin_idx = bin_idx + 1
+
+    order = np.concatenate([np.flatnonzero(valid), np.flatnonzero(~valid)])
+    tokens = pd.DataFrame({
+        "name": names[order],
+        column: values[order],
+        "log_supply": np.round(bins["logs"][order, i], 4),
+        "bin_idx": bin_idx[order]
+    })
+    # missing values become null
+    tokens.loc[~valid[order], [column, "log_supply"]] = np.nan
+    tokens = tokens.astype(object).where(tokens.notna(), None)
+
+    return {
+        "total_tokens": len(names),
         "log_base": LOG_BASE,
         "bin_edges": edges.tolist(),
-        "bin_counts": counts.tolist(),
-        "bin_labels": bin_labels,
-        "tokens": tokens_out
+        "bin_counts": np.asarray(counts).tolist(),
+        "bin_labels": np.asarray(labels).tolist(),
+        "tokens": tokens.to_dict(orient="records")
     }
 
-json_str = json.dumps(data, indent=2)
-print(json_str)
-
-with open(Path("data/result") / "max_supply_chart.json",
-          "w",
-          encoding="utf-8") as f:
-    f.write(json_str)
 
-out_path = (
-    Path(r"D:\Tokenomics\frontend\tokenomics-project\src\data")
-    / "max_supply_chart.json"
-)
-out_path.parent.mkdir(parents=True, exist_ok=True)
-with open(out_path, "w", encoding="utf-8") as f:
-    f.write(json_str)
-
-"""
-Circulating Supply
-"""
-# load data
-tokens = df[["name", "circulating_supply"]].to_dict(orient="records")
-vals = np.array([t["circulating_supply"] for t in tokens], dtype=float)
-
-# log circulating_supply
-logs = np.log(vals)
-
-# set metrics
-bin_width = 0.5
-log_base = "e"
-lo = np.floor(logs.min())
-hi = np.ceil(logs.max())
-edges = np.arange(np.floor(logs.min()),
-                  np.ceil(logs.max()) + bin_width,
-                  bin_width)
-counts, _ = np.histogram(logs, bins=edges)
-bin_labels = [fmt_range(edges[i], edges[i+1]) for i in range(len(edges)-1)]
-bin_idx = np.digitize(logs, edges) - 1
-
-# save data
-data = {
-    "total_tokens": len(tokens),
-    "log_base": log_base,
-    "bin_edges": edges.tolist(),
-    "bin_counts": counts.tolist(),
-    "bin_labels": bin_labels,
-    "tokens": [
-        {
-            "name": t["name"],
-            "circulating_supply": float(val),
-            "log_supply": round(log, 4),
-            "bin_idx": int(idx)
-        }
-        for t, val, log, idx in zip(tokens, vals, logs, bin_idx)
-    ]
-}
+def build_charts(df: pd.DataFrame, charts: dict = SUPPLY_CHARTS,
+                 sink: OutputSink | None = None) -> dict:
+    """
+    Bin all supply columns of the merged data set and write their charts.
+    """
+    sink = sink or default_sink()
+    columns = list(charts)
+    values = df[columns].apply(pd.to_numeric, errors="coerce") \
+        .to_numpy(dtype=float)
+    names = df["name"].to_numpy()
+    bins = log_bins(values)
 
-json_str = json.dumps(data, indent=2)
-print(json_str)
+    results = {}
+    for i, column in enumerate(columns):
+        result_file, frontend_file, missing_label = charts[column]
+        data = chart_data(names, column, values[:, i], bins, i,
+                          missing_label)
+        results[column] = data
 
-with open(Path("data/result") / "circulating_supply.json", "w") as f:
-    f.write(json_str)
+        sink.write(json.dumps(data, indent=2), result=result_file,
+                   frontend=frontend_file)
 
-out_path = (
-    Path(r"D:\Tokenomics\frontend\tokenomics-project\src\data")
-    / "circulating_supply_chart.json"
-)
+    return results
 
-out_path.parent.mkdir(parents=True, exist_ok=True)
 
-with open(out_path, "w", encoding="utf-8") as f:
-    f.write(json_str)
+if __name__ == "__main__":
+    # load data
+    build_charts(pd.read_csv(Path("./data/result/erc20_full_data.csv")))
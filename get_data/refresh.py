@@ -0,0 +1,142 @@
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from cmc import CMCClient, market_row
+from merge import save_full_data
+from history import SnapshotStore
+from aggregate import build_summaries
+from cooccurrence import build_cooccurrence
+from export import export_compact
+from process_supply import build_charts
+from session import PipelineSession
+from sink import default_sink
+
+"""
+Market-only refresh of the final data set.
+
+Price, market cap and supply change every minute, the agent results only
+every few months. This refresh fetches the latest CoinMarketCap quotes for
+the tokens of the last run, joins them by CMC id onto the agent columns,
+rebuilds everything the frontend reads from the market data (supply charts,
+category summaries, compact shards and the market cap weighted
+co-occurrence) and reports what changed. No agent is run.
+
+python refresh.py
+"""
+
+MARKET_COLUMNS = [
+    "price",
+    "market_cap",
+    "circulating_supply",
+    "total_supply",
+    "max_supply"
+]
+
+
+def refresh_market(previous: pd.DataFrame,
+                   quotes: list[dict]) -> pd.DataFrame:
+    """
+    Replace the market columns of the previous data set by id. Tokens
+    without a quote keep their previous numbers.
+    """
+    market = (pd.DataFrame([market_row(q) for q in quotes],
+                           columns=["id"] + MARKET_COLUMNS)
+              .drop_duplicates("id")
+              .set_index("id"))
+    current = previous.copy()
+    ids = current["id"]
+    quoted = ids.isin(market.index)
+    for col in MARKET_COLUMNS:
+        current[col] = ids.map(market[col]).where(quoted, current[col])
+    return current
+
+
+def market_changes(previous: pd.DataFrame, current: pd.DataFrame,
+                   top: int = 5) -> dict:
+    """
+    Summary of the changes between two snapshots with the same rows.
+    """
+    def pct(col):
+        before = previous[col].to_numpy(dtype=float)
+        after = current[col].to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (after - before) / before * 100
+
+    price_pct = pct("price")
+    rank_before = previous["market_cap"].rank(ascending=False, method="first")
+    rank_after = current["market_cap"].rank(ascending=False, method="first")
+    rank_change = (rank_before - rank_after).to_numpy()
+
+    supply_changed = np.zeros(len(current), dtype=bool)
+    for col in ("circulating_supply", "total_supply", "max_supply"):
+        before = previous[col].to_numpy(dtype=float)
+        after = current[col].to_numpy(dtype=float)
+        supply_changed |= ~np.isclose(before, after, equal_nan=True)
+
+    valid = np.isfinite(price_pct)
+    order = np.argsort(price_pct[valid])
+    names = current["name"].to_numpy()[valid]
+    moves = price_pct[valid]
+
+    def movers(index):
+        return [{"name": names[i], "price_change_pct": round(moves[i], 2)}
+                for i in index]
+
+    return {
+        "tokens": len(current),
+        "price_changed": int(np.count_nonzero(price_pct[valid])),
+        "supply_changed": int(supply_changed.sum()),
+        "rank_changed": int(np.count_nonzero(rank_change)),
+        "market_cap_change_pct": round(
+            (current["market_cap"].sum() / previous["market_cap"].sum() - 1)
+            * 100, 3),
+        "top_gainers": movers(order[::-1][:top]),
+        "top_losers": movers(order[:top])
+    }
+
+
+def print_changes(changes: dict):
+    print(f"{changes['tokens']} tokens ({changes['missing']} without quote): "
+          f"{changes['price_changed']} prices, "
+          f"{changes['supply_changed']} supplies and "
+          f"{changes['rank_changed']} ranks changed, total market cap "
+          f"{changes['market_cap_change_pct']:+.3f}%")
+    for label in ("top_gainers", "top_losers"):
+        moves = ", ".join(f"{m['name']} {m['price_change_pct']:+.2f}%"
+                          for m in changes[label])
+        print(f"{label.replace('_', ' ')}: {moves}")
+    print(f"local compute {changes['compute_seconds'] * 1000:.0f} ms")
+
+
+def refresh(session: PipelineSession | None = None,
+            result_path: Path = Path("data/result") /
+            "erc20_full_data.csv") -> dict:
+    session = session or PipelineSession()
+    previous = pd.read_csv(result_path)
+
+    # one quotes request per 100 ids
+    client = CMCClient(session.cmc_api_key, http=session.http)
+    quotes = client.quotes(previous["id"])
+
+    start = time.perf_counter()
+    current = refresh_market(previous, quotes)
+    changes = market_changes(previous, current)
+    changes["missing"] = int(
+        (~previous["id"].isin([q["id"] for q in quotes])).sum())
+
+    # the frontend reads the summaries and shards, not the full json
+    save_full_data(current, frontend_json=False)
+    build_charts(current)
+    build_summaries(current)
+    export_compact(current)
+    build_cooccurrence(current)
+    SnapshotStore().append(current)
+    changes["compute_seconds"] = time.perf_counter() - start
+    changes["credits"] = client.credits
+    return changes
+
+
+if __name__ == "__main__":
+    print_changes(refresh())
+    print(default_sink().summary())
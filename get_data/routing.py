@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+from pathlib import Path
+from pydantic import BaseModel
+
+"""
+Model routing per stage and subject.
+
+model_routes.json (MODEL_ROUTES) lists the models to try for a stage, a
+subject of a stage or by default, cheapest first. The next model is only
+called when the answer of the previous one does not validate, e.g. misses
+a required field, or, for the stages in escalate_on_uncertainty, when it
+fills the Uncertainty_* field. Only "extract" escalates on uncertainty by
+default, a second parsing call is cheap. The agents fill the field in most
+answers, so with "research" in it most research calls would pay for both
+models and their web searches. How often each route escalates is counted
+to tune the table.
+"""
+
+ROUTES_FILE = Path(__file__).resolve().parent / "model_routes.json"
+
+
+class ModelRouter:
+    """
+    Looks up "stage/subject", then "stage", then "default" in the routes.
+    """
+
+    def __init__(self, routes: dict | None = None):
+        if routes is None:
+            path = Path(os.getenv("MODEL_ROUTES", ROUTES_FILE))
+            routes = json.loads(path.read_text(encoding="utf-8"))
+        self.routes = routes
+        self.escalate_on_uncertainty = set(
+            routes.get("escalate_on_uncertainty", []))
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def models(self, stage: str, subject: str) -> list[str]:
+        for key in (f"{stage}/{subject}", stage, "default"):
+            if key in self.routes:
+                return list(self.routes[key])
+        raise ValueError(f"No model route for {stage}/{subject}")
+
+    def reason(self, stage: str, parsed: BaseModel | None) -> str | None:
+        """
+        Why the answer should go to the next model, None if it is good.
+        """
+        if parsed is None:
+            return "validation"
+        if stage in self.escalate_on_uncertainty and uncertainty(parsed):
+            return "uncertainty"
+        return None
+
+    def record(self, stage: str, subject: str, model: str, attempt: int,
+               reason: str | None):
+        """
+        Count one answer of a route. reason is None for the final answer.
+        """
+        with self.lock:
+            stats = self.stats.setdefault((stage, subject), {
+                "calls": 0, "escalated": 0, "validation": 0,
+                "uncertainty": 0, "final": {}})
+            if attempt == 0:
+                stats["calls"] += 1
+            if reason is not None:
+                stats[reason] += 1
+                if attempt == 0:
+                    stats["escalated"] += 1
+            else:
+                stats["final"][model] = stats["final"].get(model, 0) + 1
+
+    def summary(self) -> list[dict]:
+        with self.lock:
+            return [{"stage": stage, "subject": subject, **stats,
+                     "rate": round(stats["escalated"] / stats["calls"], 3)
+                     if stats["calls"] else 0.0}
+                    for (stage, subject), stats in sorted(self.stats.items())]
+
+
+def uncertainty(parsed: BaseModel) -> str | None:
+    """
+    The non-empty Uncertainty_* text of a subject result, if any.
+    """
+    for profile in getattr(parsed, "tokens", []):
+        for field, value in profile:
+            if field.startswith("Uncertainty_") and value \
+                    and str(value).strip():
+                return value
+    return None
+
+
+def print_routing(summary: list[dict]):
+    print(f"\n{'stage':<15} {'subject':<18} {'calls':>5} {'escalated':>9} "
+          f"{'rate':>6} {'valid.':>6} {'uncert.':>7}  final models")
+    for s in summary:
+        final = ", ".join(f"{model} {n}" for model, n in s["final"].items())
+        print(f"{s['stage']:<15} {s['subject']:<18} {s['calls']:>5} "
+              f"{s['escalated']:>9} {s['rate'] * 100:>5.1f}% "
+              f"{s['validation']:>6} {s['uncertainty']:>7}  {final}")
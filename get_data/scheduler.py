@@ -0,0 +1,272 @@
+import asyncio
+import random
+import threading
+import time
+
+"""
+Bounded-concurrency scheduler for the (token, subject) research jobs.
+
+The jobs are awaited concurrently up to a fixed limit. A token bucket keeps
+the calls below the OpenAI requests/minute and tokens/minute limits and a
+429 answer pauses every worker with an exponential backoff, instead of
+sleeping a fixed time after each job.
+"""
+
+
+class RateLimiter:
+    """
+    Token bucket for the requests/minute and tokens/minute limits.
+    Both buckets start full and refill continuously. A call takes an
+    estimate of its tokens and settles it with its usage afterwards.
+    """
+
+    def __init__(self, rpm: int = 500, tpm: int = 30000,
+                 tokens_per_request: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        # estimate used when a caller does not know its token count
+        self.tokens_per_request = tokens_per_request
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        # a thread lock, extract_data calls it from worker threads
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def _tokens(self, requests: int, tokens: int | None) -> int:
+        if tokens is None:
+            tokens = requests * self.tokens_per_request
+        # a single call can never ask for more than a full bucket
+        return min(tokens, self.tpm)
+
+    def _take(self, requests: int, tokens: int | None) -> float:
+        """
+        Take the capacity if available and return 0, otherwise return the
+        seconds to wait before trying again.
+        """
+        requests = min(requests, self.rpm)
+        tokens = self._tokens(requests, tokens)
+
+        with self.lock:
+            self._refill()
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.requests >= requests and self.tokens >= tokens:
+                self.requests -= requests
+                self.tokens -= tokens
+                return 0.0
+            return max((requests - self.requests) * 60 / self.rpm,
+                       (tokens - self.tokens) * 60 / self.tpm)
+
+    async def acquire(self, requests: int = 1,
+                      tokens: int | None = None) -> int:
+        """
+        Wait until the buckets hold enough capacity and take it. Returns
+        the tokens taken, to settle them with the usage of the call.
+        """
+        while wait := self._take(requests, tokens):
+            await asyncio.sleep(wait)
+        return self._tokens(min(requests, self.rpm), tokens)
+
+    def acquire_sync(self, requests: int = 1,
+                     tokens: int | None = None) -> int:
+        """
+        Blocking acquire for calls made from worker threads.
+        """
+        while wait := self._take(requests, tokens):
+            time.sleep(wait)
+        return self._tokens(min(requests, self.rpm), tokens)
+
+    def settle(self, taken: int, used: int):
+        """
+        Correct the tokens taken for a call by its actual usage: refund
+        what it did not use, charge what it used on top. A bucket in debt
+        holds back the next calls until it has refilled.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tpm, self.tokens + taken - used)
+
+    def pause(self, seconds: float):
+        """
+        Hold back every worker, e.g. after a 429 answer.
+        """
+        self.paused_until = max(self.paused_until,
+                                time.monotonic() + seconds)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+def backoff_delay(error: Exception, attempt: int,
+                  base: float = 2.0, cap: float = 60.0) -> float:
+    """
+    Exponential backoff with jitter. A Retry-After header wins if present.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class Throughput:
+    """
+    Count finished jobs and report jobs/min while the run is going.
+    """
+
+    def __init__(self, total: int, report_every: int = 10):
+        self.total = total
+        self.report_every = report_every
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def jobs_per_minute(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return (self.done + self.failed) / elapsed * 60 if elapsed else 0.0
+
+    def record(self, ok: bool):
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+        finished = self.done + self.failed
+        if finished % self.report_every == 0 or finished == self.total:
+            print(f"--- {finished}/{self.total} jobs, "
+                  f"{self.jobs_per_minute():.1f} jobs/min ---")
+
+    def summary(self) -> dict:
+        return {
+            "jobs": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "seconds": round(time.monotonic() - self.started, 1),
+            "jobs_per_minute": round(self.jobs_per_minute(), 2)
+        }
+
+
+async def _run_with_backoff(job, worker, limiter: RateLimiter,
+                            requests_per_job: int, tokens_per_job: int,
+                            max_retries: int) -> Exception | None:
+    """
+    Await worker(job), retry rate limited calls after a backoff.
+    Returns the error that made the job fail, None on success.
+    """
+    for attempt in range(max_retries + 1):
+        # jobs may also acquire per API call themselves
+        if requests_per_job or tokens_per_job:
+            await limiter.acquire(requests_per_job, tokens_per_job)
+        try:
+            await worker(job)
+            return None
+        except Exception as e:
+            if is_rate_limit_error(e) and attempt < max_retries:
+                delay = backoff_delay(e, attempt)
+                print(f"Rate limited {job}, retry in {delay:.1f}s")
+                limiter.pause(delay)
+                continue
+            print(f"Error {job}: {e}")
+            return e
+
+
+def _print_summary(summary: dict, concurrency: int):
+    print(f"\n--- Finished {summary['done']}/{summary['jobs']} jobs "
+          f"({summary['failed']} failed) in {summary['seconds']}s, "
+          f"{summary['jobs_per_minute']} jobs/min "
+          f"at concurrency {concurrency} ---")
+
+
+async def run_jobs(jobs, worker, concurrency: int = 8,
+                   limiter: RateLimiter | None = None,
+                   requests_per_job: int = 1, tokens_per_job: int = 0,
+                   max_retries: int = 5) -> dict:
+    """
+    Await worker(job) for every job with at most `concurrency` jobs in
+    flight. Rate limited jobs are retried after a backoff, other errors
+    are reported and the job is given up.
+    """
+    jobs = list(jobs)
+    limiter = limiter or RateLimiter()
+    semaphore = asyncio.Semaphore(concurrency)
+    throughput = Throughput(len(jobs))
+
+    async def run(job):
+        async with semaphore:
+            error = await _run_with_backoff(job, worker, limiter,
+                                            requests_per_job, tokens_per_job,
+                                            max_retries)
+            throughput.record(error is None)
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
+    summary = throughput.summary()
+    _print_summary(summary, concurrency)
+    return summary
+
+
+async def run_queue(queue, worker, concurrency: int = 8,
+                    limiter: RateLimiter | None = None,
+                    requests_per_job: int = 0, tokens_per_job: int = 0,
+                    max_retries: int = 5, poll: float = 5.0) -> dict:
+    """
+    Like run_jobs, but the jobs are claimed from a JobQueue that other
+    worker processes may share. Each result is written back to the queue.
+    Stops when nothing is left to claim and no live worker holds a job.
+    The process sends a heartbeat every poll seconds and gives its jobs
+    back when it is stopped.
+    """
+    limiter = limiter or RateLimiter()
+    throughput = Throughput(queue.pending())
+
+    async def heartbeat():
+        while True:
+            queue.heartbeat()
+            await asyncio.sleep(poll)
+
+    async def run():
+        while True:
+            job = queue.claim()
+            if job is None:
+                # jobs of stopped workers can be claimed again
+                if queue.release():
+                    continue
+                # a running research job may still unblock its extraction
+                if queue.running() == 0:
+                    return
+                await asyncio.sleep(poll)
+                continue
+            error = await _run_with_backoff(job, worker, limiter,
+                                            requests_per_job, tokens_per_job,
+                                            max_retries)
+            if error is None:
+                queue.complete(job)
+            else:
+                queue.fail(job, error)
+            throughput.record(error is None)
+
+    beat = asyncio.create_task(heartbeat())
+    try:
+        await asyncio.gather(*(run() for _ in range(concurrency)))
+    finally:
+        beat.cancel()
+        queue.leave()
+
+    summary = throughput.summary()
+    _print_summary(summary, concurrency)
+    return summary
@@ -0,0 +1,199 @@
+import os
+from functools import cached_property
+from pathlib import Path
+import pandas as pd
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from cmc import URL_COLUMNS
+
+"""
+Long-lived state of a pipeline run.
+
+The API keys, the token list and the instruction texts are loaded once and
+the HTTP clients keep their connection pools for the whole run, instead of
+being rebuilt by every research_agent and extract_data call.
+"""
+
+
+class PipelineSession:
+    """
+    Shared context of research_agent, extract_data and the fetch step.
+    """
+
+    def __init__(self, token_file: Path = Path("data/erc20_data") /
+                 "erc20_data.csv",
+                 instruction_dir: Path = Path("instructions"),
+                 pool_size: int = 32):
+        # load keys
+        load_dotenv(override=True)
+        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.cmc_api_key = os.getenv("X-CMC_PRO_API_KEY")
+
+        self.token_file = Path(token_file)
+        self.instruction_dir = Path(instruction_dir)
+        self.pool_size = pool_size
+        self.instructions = {}
+        self.erc20_data = None
+        self.by_name = {}
+        self.by_id = {}
+        if self.token_file.exists():
+            self.load_tokens()
+
+    def load_tokens(self, erc20_data: pd.DataFrame | None = None):
+        """
+        (Re)load the token list and index it by name and CMC id.
+        """
+        if erc20_data is None:
+            erc20_data = pd.read_csv(self.token_file)
+        self.erc20_data = erc20_data.reset_index(drop=True)
+        self.by_name = {name: i for i, name in
+                        enumerate(self.erc20_data["name"])}
+        if "id" in self.erc20_data.columns:
+            self.by_id = {int(cmc_id): i for i, cmc_id in
+                          enumerate(self.erc20_data["id"])}
+
+    def token(self, token_loc: int) -> str:
+        """
+        Name of the token at the 1-based position of the list.
+        """
+        if self.erc20_data is None:
+            raise ValueError(f"Token list {self.token_file} not found")
+        return self.erc20_data["name"].iloc[token_loc - 1]
+
+    def cmc_id(self, token_loc: int) -> int:
+        """
+        CoinMarketCap id of the token, the key of its artifacts.
+        """
+        if "id" not in self.erc20_data.columns:
+            raise ValueError(f"Token list {self.token_file} has no id")
+        return int(self.erc20_data["id"].iloc[token_loc - 1])
+
+    def token_identity(self, token_loc: int) -> dict:
+        """
+        Fields of the token list that identify a token in the cache keys.
+        """
+        row = self.erc20_data.iloc[token_loc - 1]
+        return {col: str(row[col])
+                for col in ["id", "name", "contract"] + URL_COLUMNS
+                if col in self.erc20_data.columns}
+
+    def token_urls(self, token_loc: int) -> dict:
+        """
+        Project links of the token list (whitepaper_url, website_url,
+        docs_url), empty ones are left out.
+        """
+        row = self.erc20_data.iloc[token_loc - 1]
+        return {col: row[col] for col in URL_COLUMNS
+                if col in self.erc20_data.columns and pd.notna(row[col])
+                and row[col]}
+
+    def token_loc(self, name: str | None = None,
+                  cmc_id: int | None = None) -> int:
+        """
+        1-based position of a token by its name or CMC id.
+        """
+        if cmc_id is not None:
+            return self.by_id[int(cmc_id)] + 1
+        return self.by_name[name] + 1
+
+    def load_instructions(self, subjects: list[str]):
+        """
+        Read the instructions of all subjects at startup, the prompts of
+        a run then start with the same bytes.
+        """
+        for subject in subjects:
+            self.instruction(subject)
+
+    def instruction(self, subject: str) -> str:
+        if subject not in self.instructions:
+            file_path = self.instruction_dir / f"{subject}_instruction.txt"
+            with file_path.open("r", encoding="utf-8") as f:
+                self.instructions[subject] = f.read()
+        return self.instructions[subject]
+
+    def _require_openai_key(self) -> str:
+        if self.openai_api_key is None:
+            raise ValueError("API Key not found")
+        return self.openai_api_key
+
+    @cached_property
+    def openai(self):
+        """
+        Pooled client of the extraction calls.
+        """
+        from openai import OpenAI, DefaultHttpxClient
+        from telemetry import on_response
+        # the hook counts requests and retries for the telemetry
+        return OpenAI(api_key=self._require_openai_key(),
+                      http_client=DefaultHttpxClient(
+                          event_hooks={"response": [on_response]}))
+
+    @cached_property
+    def async_openai(self):
+        """
+        Pooled client of the agent runs.
+        """
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        from telemetry import on_response_async
+        return AsyncOpenAI(api_key=self._require_openai_key(),
+                           http_client=DefaultAsyncHttpxClient(
+                               event_hooks={"response": [on_response_async]}
+                           ))
+
+    @cached_property
+    def run_config(self):
+        """
+        RunConfig that makes Runner.run use the pooled async client.
+        """
+        from agents import RunConfig
+        from agents.models.openai_provider import OpenAIProvider
+        return RunConfig(
+            model_provider=OpenAIProvider(openai_client=self.async_openai)
+        )
+
+    @cached_property
+    def artifacts(self):
+        """
+        Store of the agent outputs and results, see artifacts.py.
+        """
+        from artifacts import ArtifactStore
+        return ArtifactStore(os.getenv("ARTIFACT_DB",
+                                       "data/artifacts.sqlite"))
+
+    @cached_property
+    def http(self) -> requests.Session:
+        """
+        Pooled session for CoinMarketCap.
+        """
+        if self.cmc_api_key is None:
+            raise ValueError("API Key not found")
+        http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size,
+                              pool_maxsize=self.pool_size)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+        http.headers.update({"X-CMC_PRO_API_KEY": self.cmc_api_key,
+                             "Accepts": "application/json"})
+        return http
+
+    def close(self):
+        if "openai" in self.__dict__:
+            self.openai.close()
+        if "artifacts" in self.__dict__:
+            self.artifacts.conn.close()
+        if "http" in self.__dict__:
+            self.http.close()
+
+
+_default_session = None
+
+
+def default_session() -> PipelineSession:
+    """
+    Session of callers that do not pass their own one.
+    """
+    global _default_session
+    if _default_session is None:
+        _default_session = PipelineSession()
+    return _default_session
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+"""
+Output sink of the pipeline artifacts.
+
+Every artifact is serialized once and written to the configured
+destinations: data/result (RESULT_DIR) and the data folder of the frontend
+(FRONTEND_DATA_DIR, "off" to disable). Writes are atomic, a temp file in
+the target folder is renamed over the old file, and skipped when the file
+already has the same content, so an unchanged chart does not trigger a
+rebuild and reload of the dashboard.
+"""
+
+FRONTEND_DATA = Path(__file__).resolve().parent.parent / "frontend" / \
+    "tokenomics-project" / "src" / "data"
+
+
+class OutputSink:
+    """
+    Named destination folders, e.g. {"result": ..., "frontend": ...}.
+    """
+
+    def __init__(self, destinations: dict[str, Path] | None = None,
+                 echo: bool = False):
+        if destinations is None:
+            destinations = {
+                "result": os.getenv("RESULT_DIR", "data/result"),
+                "frontend": os.getenv("FRONTEND_DATA_DIR",
+                                      str(FRONTEND_DATA))
+            }
+        self.destinations = {label: Path(path) for label, path
+                             in destinations.items()
+                             if path and str(path).lower() != "off"}
+        # print the payloads, for debugging only
+        self.echo = echo or os.getenv("OUTPUT_ECHO") == "1"
+        self.written = 0
+        self.unchanged = 0
+
+    def directory(self, label: str) -> Path | None:
+        return self.destinations.get(label)
+
+    def write(self, payload: str | bytes, **names) -> list[Path]:
+        """
+        Write the payload as names[label] to each destination that is
+        configured, e.g. write(data, result="a.json", frontend="b.json").
+        Returns the paths that changed.
+        """
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if self.echo:
+            print(payload.decode("utf-8", errors="replace"))
+
+        digest = hashlib.sha256(payload).digest()
+        changed = []
+        for label, name in names.items():
+            directory = self.destinations.get(label)
+            if directory is None or name is None:
+                continue
+            path = directory / name
+            if _digest(path) == digest:
+                self.unchanged += 1
+                continue
+            _atomic_write(path, payload)
+            self.written += 1
+            changed.append(path)
+        return changed
+
+    def summary(self) -> str:
+        return (f"outputs: {self.written} written, "
+                f"{self.unchanged} unchanged")
+
+
+def _digest(path: Path) -> bytes | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).digest()
+    except OSError:
+        return None
+
+
+def _atomic_write(path: Path, payload: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent,
+                                    prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        # mkstemp creates the file private, the dev server has to read it
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+_default_sink = None
+
+
+def default_sink() -> OutputSink:
+    """
+    Sink of callers that do not pass their own one.
+    """
+    global _default_sink
+    if _default_sink is None:
+        _default_sink = OutputSink()
+    return _default_sink
@@ -0,0 +1,273 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+
+"""
+Per-call telemetry of the agent and extraction calls.
+
+Every API call is recorded with its latency, the time it waited for the
+rate limiter, input, cached and output tokens, web searches, HTTP retries
+and the estimated cost, one JSON line per call in data/metrics.jsonl. The
+summary at the end of a run shows p50/p95 latency and cost per stage and
+subject and the calls that were far slower or more expensive than the
+other calls of their subject.
+"""
+
+# USD per 1M tokens, cached input is billed at half the price
+PRICES = {
+    "gpt-4o": {"input": 2.50, "cached": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached": 0.075, "output": 0.60}
+}
+# USD per web search call of the search tool
+WEB_SEARCH_PRICE = 0.025
+# the Batch API bills half of the token prices
+BATCH_DISCOUNT = 0.5
+
+# the call of the current task or thread, seen by the HTTP hooks
+_current = contextvars.ContextVar("telemetry_call", default=None)
+
+
+class Call:
+    """
+    Measurements of one API call, filled in while it runs.
+    """
+
+    def __init__(self, **fields):
+        self.record = {
+            **fields,
+            "queue_wait": 0.0,
+            "latency": 0.0,
+            "input_tokens": 0,
+            "cached_tokens": 0,
+            "output_tokens": 0,
+            "web_searches": 0,
+            "http_requests": 0,
+            "retries": 0,
+            "cost": 0.0,
+            "ok": False
+        }
+        self.created = time.perf_counter()
+        self.started = None
+
+    def start(self):
+        """
+        Mark the end of the wait for the rate limiter.
+        """
+        self.started = time.perf_counter()
+        self.record["queue_wait"] = round(self.started - self.created, 4)
+
+    def add_usage(self, usage):
+        """
+        Add the usage of an agent run or a Responses API answer.
+        """
+        if usage is None:
+            return
+        details = getattr(usage, "input_tokens_details", None)
+        self.record["input_tokens"] += usage.input_tokens or 0
+        self.record["output_tokens"] += usage.output_tokens or 0
+        self.record["cached_tokens"] += \
+            getattr(details, "cached_tokens", 0) or 0
+
+    def tokens(self) -> int:
+        """
+        Input and output tokens used so far, what the tokens/minute limit
+        counts.
+        """
+        return self.record["input_tokens"] + self.record["output_tokens"]
+
+    def add_web_searches(self, responses):
+        """
+        Count the web search calls in the outputs of the model responses.
+        """
+        for response in responses:
+            self.record["web_searches"] += sum(
+                1 for item in response.output
+                if getattr(item, "type", None) == "web_search_call")
+
+    def response(self, status_code: int):
+        self.record["http_requests"] += 1
+        # the client retries these itself
+        if status_code == 429 or status_code >= 500:
+            self.record["retries"] += 1
+
+    def cost(self) -> float:
+        prices = PRICES.get(self.record.get("model"), PRICES["gpt-4o"])
+        r = self.record
+        tokens = ((r["input_tokens"] - r["cached_tokens"]) * prices["input"]
+                  + r["cached_tokens"] * prices["cached"]
+                  + r["output_tokens"] * prices["output"]) / 1e6
+        if r.get("batch"):
+            tokens *= BATCH_DISCOUNT
+        return tokens + r["web_searches"] * WEB_SEARCH_PRICE
+
+
+class Telemetry:
+    """
+    Collects the calls of a run and appends them to a JSONL file.
+    Shared by all workers, extract_data writes from threads.
+    """
+
+    def __init__(self, path: Path = Path("data/metrics.jsonl")):
+        self.path = Path(path)
+        self.records = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def call(self, **fields):
+        """
+        Measure the API call in the with block. Fields such as stage,
+        subject, token and model are stored with the measurements.
+        """
+        call = Call(**fields)
+        token = _current.set(call)
+        try:
+            yield call
+            call.record["ok"] = True
+        except Exception as e:
+            call.record["error"] = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            _current.reset(token)
+            end = time.perf_counter()
+            call.record["latency"] = round(
+                end - (call.started or call.created), 4)
+            call.record["cost"] = round(call.cost(), 6)
+            self.write(call.record)
+
+    def write(self, record: dict):
+        record = {"time": datetime.now(timezone.utc)
+                  .isoformat(timespec="seconds"), **record}
+        with self.lock:
+            self.records.append(record)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def summary(self, outlier_factor: float = 3.0, top: int = 10) -> dict:
+        """
+        p50/p95 latency, tokens and cost per (stage, subject, model),
+        totals and the calls more than outlier_factor times slower or more
+        expensive than the median call of their group.
+        """
+        with self.lock:
+            records = list(self.records)
+
+        groups = {}
+        for r in records:
+            key = (r.get("stage"), r.get("subject"), r.get("model"))
+            groups.setdefault(key, []).append(r)
+
+        rows = []
+        outliers = []
+        for (stage, subject, model), calls in sorted(
+                groups.items(), key=lambda g: str(g[0])):
+            latency = np.array([c["latency"] for c in calls])
+            cost = np.array([c["cost"] for c in calls])
+            p50, p95 = np.percentile(latency, [50, 95])
+            cost_p50 = float(np.median(cost))
+            rows.append({
+                "stage": stage,
+                "subject": subject,
+                "model": model,
+                "calls": len(calls),
+                "failed": sum(not c["ok"] for c in calls),
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "queue_wait": round(float(np.mean(
+                    [c["queue_wait"] for c in calls])), 2),
+                "retries": sum(c["retries"] for c in calls),
+                "cached": cached_share(calls),
+                "cost": round(float(cost.sum()), 4),
+                "cost_per_call": round(float(cost.mean()), 5)
+            })
+            for c in calls:
+                reasons = []
+                if p50 and c["latency"] > outlier_factor * p50:
+                    reasons.append(f"latency {c['latency'] / p50:.1f}x p50")
+                if cost_p50 and c["cost"] > outlier_factor * cost_p50:
+                    reasons.append(f"cost {c['cost'] / cost_p50:.1f}x p50")
+                if reasons:
+                    outliers.append({"stage": stage, "subject": subject,
+                                     "model": model,
+                                     "token": c.get("token"),
+                                     "latency": c["latency"],
+                                     "cost": c["cost"],
+                                     "reason": ", ".join(reasons)})
+
+        input_tokens = sum(r["input_tokens"] for r in records)
+        cached_tokens = sum(r["cached_tokens"] for r in records)
+        outliers.sort(key=lambda o: o["latency"], reverse=True)
+        return {
+            "calls": len(records),
+            "cost": round(sum(r["cost"] for r in records), 4),
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "output_tokens": sum(r["output_tokens"] for r in records),
+            "web_searches": sum(r["web_searches"] for r in records),
+            "retries": sum(r["retries"] for r in records),
+            "groups": rows,
+            "outliers": outliers[:top]
+        }
+
+
+def cached_share(records: list[dict]) -> float:
+    """
+    Share of the input tokens served from the prompt cache.
+    """
+    input_tokens = sum(r["input_tokens"] for r in records)
+    return round(sum(r["cached_tokens"] for r in records) / input_tokens,
+                 3) if input_tokens else 0.0
+
+
+def print_summary(summary: dict):
+    cached = (summary["cached_tokens"] / summary["input_tokens"] * 100
+              if summary["input_tokens"] else 0.0)
+    print(f"\n--- {summary['calls']} API calls, ${summary['cost']:.2f}, "
+          f"{summary['input_tokens']} input tokens ({cached:.1f}% cached), "
+          f"{summary['output_tokens']} output tokens, "
+          f"{summary['web_searches']} web searches, "
+          f"{summary['retries']} retries ---")
+    print(f"{'stage':<15} {'subject':<18} {'model':<12} {'calls':>5} "
+          f"{'p50 s':>6} {'p95 s':>6} {'wait s':>6} {'cached':>6} "
+          f"{'cost $':>8} {'$/call':>8}")
+    for g in summary["groups"]:
+        print(f"{g['stage']:<15} {g['subject']:<18} {g['model']:<12} "
+              f"{g['calls']:>5} "
+              f"{g['p50']:>6.2f} {g['p95']:>6.2f} {g['queue_wait']:>6.2f} "
+              f"{g['cached'] * 100:>5.1f}% "
+              f"{g['cost']:>8.4f} {g['cost_per_call']:>8.5f}")
+    for o in summary["outliers"]:
+        print(f"outlier {o['stage']} {o['subject']} {o['model']} "
+              f"{o['token']}: "
+              f"{o['latency']:.1f}s ${o['cost']:.4f} ({o['reason']})")
+
+
+def on_response(response):
+    """
+    httpx response hook of the OpenAI clients, counts requests and
+    retried errors of the current call.
+    """
+    call = _current.get()
+    if call is not None:
+        call.response(response.status_code)
+
+
+async def on_response_async(response):
+    on_response(response)
+
+
+@contextmanager
+def track(telemetry: Telemetry | None, **fields):
+    """
+    telemetry.call(**fields), or an unrecorded Call without telemetry.
+    """
+    if telemetry is None:
+        yield Call(**fields)
+        return
+    with telemetry.call(**fields) as call:
+        yield call